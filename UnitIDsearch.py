@@ -1,38 +1,31 @@
-import os
-import pandas as pd
-import re
+from time import perf_counter
+startup_started = perf_counter()
+
 import tkinter as tk
 from tkinter import messagebox, filedialog
-from datetime import datetime, time
+from datetime import datetime
 from tkcalendar import DateEntry
-import tempfile
-import json
 import logging
+import multiprocessing
 import sys
-import csv
-
-# Set up a logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+import threading
+from search_engine import load_config, read_production_pcs, read_terms_file, run_line_search, run_uid_search, SearchProgress
+from genealogy import run_genealogy_search
+from log_setup import setup_logging
 
-# Create a file handler
-file_handler = logging.FileHandler('UnitID_Log.txt', mode='a')  # Append mode
-file_handler.setLevel(logging.INFO)
+# The parsing processes of the built executable start it again, they run their task here instead of opening a window
+multiprocessing.freeze_support()
 
-# Create a console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-
-# Define a log format
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+# Load confiduration from config.json
+config = load_config('config.json')
 
-# Set the formatter for both handlers
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
+# Parsing processes started from the script would run all of it again, so only the built executable uses them
+if not getattr(sys, 'frozen', False):
+    config['parse_processes'] = 0
 
-# Add the handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Set up logging to a size-rotated log file and the console, debug output of the search loops is off unless log_level is DEBUG
+setup_logging(config['log_path'], config['log_level'], config['log_max_bytes'], config['log_backup_count'])
+logger = logging.getLogger()
 
 # Redirect standard output to the logging system
 class StreamToLogger:
@@ -50,135 +43,18 @@ class StreamToLogger:
 # Redirect stdout to the logger
 sys.stdout = StreamToLogger(logger, logging.INFO)  # Use logger instance
 sys.stderr = StreamToLogger(logger, logging.ERROR)  # Optionally redirect stderr as well
-# Load confiduration from config.json
-with open('config.json', 'r') as config_file:
-    config = json.load(config_file)
-    
+
 output_path_uid = config['output_path_uids']
 output_path_lines = config['output_path_lines']
+output_path_genealogy = config['output_path_genealogy']
 production_pc_source = config['production_pc_path']
 nr_of_columns = config['number_of_columns']
 
-# Function to read production PC names and paths from the Excel file
-def read_production_pcs(file_path):
-    production_pcs = {}
-    try:
-        df = pd.read_excel(file_path)
-        for index, row in df.iterrows():
-            drive_name = row['drive_name']
-            drive_path = row['drive_path']
-            production_pcs[drive_name] = drive_path
-    except Exception as e:
-        print(f"Error reading Excel file: {e}")
-    return production_pcs
-
-# Function to extract the station name from the folder before the "Logs" folder
-def extract_station_name_from_logs(file_path): 
-    # Correctly combine the regex pattern with re.IGNORECASE flag
-    match = re.search(r'([^\\\/]+)[\\\/]Logs[\\\/]', file_path, re.IGNORECASE)
-    print("First: ", match)
-    if match:
-        station_folder = match.group(1)
-        match_station = re.search(r'^[^_]*_[^_]*_(.*)', station_folder)
-        print("Second: ", match_station)
-        if match_station:
-            station_name = match_station.group(1)
-            return station_name
-    return "Unknown Station"
-
-# Function to process the tracer files
-def process_file(file_path, drive_name, search_terms, found_terms, temp_file, is_non_standard):
-    results = []
-    try:
-        with open(file_path, 'r') as file:
-            station_name = extract_station_name_from_logs(file_path)
-            lines = file.readlines()
-            for i, line in enumerate(lines):
-                for term in search_terms:
-                    if term in line:
-                        found_terms.add(term)
-                        temp_file.write(term + "\n")
-                        result_message = f"{drive_name} - {station_name}\n{line.strip()}\n"
-                        if 'UNIT_RESULT' in line and i < len(lines) - 1:
-                            next_line = lines[i + 1].strip()
-                            result_message += f"{next_line}\n"
-                        results.append(result_message)
-                        # Testing with different sample paths
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
-    return results
-
-# Function to traverse directories and process tracer files within a date range
-def traverse_directory(root_dir, drive_name, search_terms, start_date, end_date, station_name, found_terms, temp_file, is_non_standard):
-    results = []
-    try:
-        print(f"Processing drive: {drive_name} at path: {root_dir}")
-        start_datetime = datetime.combine(start_date, time.min)
-        end_datetime = datetime.combine(end_date, time.max)
-
-        for root, dirs, files in os.walk(root_dir):
-            for file in files:
-                
-                # Check for standard application logs
-                if not is_non_standard:
-                    # Match "VitescoAppMonitoringService.log." with date and version suffixes
-                    if (file.lower().startswith("vitescoappmonitoringservice.log.") or 
-                        file.lower().endswith("tracer.txt")) and station_name.lower() in root.lower():
-                        
-                        file_path = os.path.join(root, file)
-                        
-                        # Skip files with 'old', 'not_used', etc. in their names
-                        if 'old' in file_path.lower() or 'not_used' in file_path.lower() or 'not used' in file_path.lower():
-                            continue
-
-                        # Check if the file modification time falls within the specified date range
-                        file_mod_time = os.path.getmtime(file_path)
-                        file_date = datetime.fromtimestamp(file_mod_time)
-                        if start_datetime <= file_date <= end_datetime:
-                            print(f"Processing file: {file_path}")
-                            results.extend(process_file(file_path, drive_name, search_terms, found_terms, temp_file, is_non_standard))
-
-                # Check for non-standard application logs
-                else:
-                    if (file.lower().startswith("logging") or file.lower().endswith(".log")) and station_name.lower() in root.lower():
-                        
-                        file_path = os.path.join(root, file)
-                        
-                        # Skip files with 'old', 'not_used', etc. in their names
-                        if 'old' in file_path.lower() or 'not_used' in file_path.lower() or 'not used' in file_path.lower():
-                            continue
-
-                        # Check if the file modification time falls within the specified date range
-                        file_mod_time = os.path.getmtime(file_path)
-                        file_date = datetime.fromtimestamp(file_mod_time)
-                        if start_datetime <= file_date <= end_datetime:
-                            print(f"Processing file: {file_path}")
-                            results.extend(process_file(file_path, drive_name, search_terms, found_terms, temp_file, is_non_standard))
-                    
-    except Exception as e:
-        print(f"Error traversing directory {root_dir}: {e}")
-    return results
-
-
-# Function to hide the window
-def hide_window():
-    root.withdraw()
-    
-#Function to combine the search lines function with the hide window function to put them on a single button
-def line_hide_combine():
-    hide_window()
-    search_lines()
-    
-#Function to combine the search uids function with the hide window function to put them on a single button
-def uid_hide_combine():
-    hide_window()
-    search_and_output_uids()
-
-# Function to unhide the main window
-def unhide_window():
-    root.deiconify()
-    
-import csv
+# Number of result lines kept in the live results view
+max_live_result_lines = config['max_live_result_lines']
+
+# State of the search running on the worker thread
+search_state = {'thread': None, 'progress': None, 'cancel_event': None, 'summary': None}
 
 # Function to handle the search and output UIDs functionality
 def search_and_output_uids():
@@ -202,12 +78,18 @@ def search_and_output_uids():
     # Get the non-standard selection
     is_non_standard = non_standard_var.get()
 
+    # Get the UID index selection
+    use_index = use_index_var.get()
+
+    # Get the full rescan selection
+    full_rescan = full_rescan_var.get()
+
+    # Get the new log data only selection
+    incremental = incremental_var.get()
+
     # Get selected drives from the checkboxes
     selected_drives = [drive for drive, var in drive_vars.items() if var.get()]
 
-    results = []
-    found_terms = set()
-    
     # Fetch the number of subassemblies, default to 1
     try:
         n = int(subassy_entry.get())
@@ -219,171 +101,9 @@ def search_and_output_uids():
         messagebox.showwarning("Input Error", "There must be at least one subassembly.")
         return
 
-    # Create a temporary file to store found terms
-    with tempfile.NamedTemporaryFile(delete=False, mode='w') as temp_file:
-        temp_file_path = temp_file.name
-
-        for drive_name in selected_drives:
-            drive_path = production_pcs.get(drive_name)
-            if drive_path:
-                drive_results = traverse_directory_uids(drive_path, drive_name, search_terms, start_date, end_date, station_name, found_terms, temp_file, is_non_standard, n)
-                results.extend(drive_results)
-
-    not_found = set(search_terms) - found_terms
-    output_file_path = output_path_uid
-
-    try:
-        with open(output_file_path, 'w', newline='') as output_file:
-            csv_writer = csv.writer(output_file)
-
-            # Dynamically generate the header row based on n
-            header = ['Drive Name', 'Station Name', 'UID In'] + [f'UID Assy {i + 1}' for i in range(n)]
-            csv_writer.writerow(header)  # Write the header row
-
-            if not results:
-                messagebox.showinfo("Search Results", "No matching results found.")
-                return
-
-            # Iterate over results
-            for result in results:
-                if len(result) != n + 3:  # Ensure the result is the expected length
-                    logger.warning(f"Unexpected result format: {result}")
-                    continue
-
-                drive_name = result[0]
-                station_name = result[1]
-                uid_in = result[2]
-                uid_assy_list = result[3:n+3]
-
-                if uid_in is None or any(assy is None for assy in uid_assy_list):
-                    logger.warning(f"Incomplete UID data in result: {result}")
-                    continue
-
-                # Write the row with drive name, station name, UID In, and 'n' UID Assy values
-                csv_writer.writerow([drive_name, station_name, uid_in] + uid_assy_list)
-
-        messagebox.showinfo("Search Results", f"Results written to {output_file_path}")
-        unhide_window()
-
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not write to file: {e}")
-        unhide_window()
-
-    # Delete the temporary file
-    os.remove(temp_file_path)
-
-# Function to process files and extract UID details based on dynamic uid_assy fields
-def process_file_uids(file_path, drive_name, search_terms, found_terms, temp_file, is_non_standard, n):
-    results = []
-
-    # Retrieve value from subassy_entry and validate
-    n = int(subassy_entry.get())  # Assuming subassy_entry is defined elsewhere
-    if str(n) == '0':
-        messagebox.showwarning("Input Error", "There must be at least one subassembly")
-        return
-    
-    # Initialize a set to track processed uid groups
-    processed_uid_groups = set()
-
-    try:
-        # Debugging file path before extracting station name
-        print(f"Processing file path in process_file_uids: {file_path}")
-
-        # Extract station name from the entry (assuming station_entry is defined elsewhere)
-        station_name = station_entry.get()
-        print(f"Extracted station name in process_file_uids: {station_name}")  # Debug
-
-        with open(file_path, 'r') as file:
-            station_name = station_entry.get()
-            lines = file.readlines()
-            for i, line in enumerate(lines):
-                for term in search_terms:
-                    if term in line:
-                        found_terms.add(term)
-                        temp_file.write(term + "\n")
-                        
-                        # Search for uid_in
-                        uid_in_match = re.search(r'uid_in="([^"]+)"', line)
-                        uid_in = uid_in_match.group(1) if uid_in_match else None
-                        
-                        # Search for uid_assy_1 to uid_assy_n
-                        uid_assy_list = []
-                        for j in range(1, n + 1):
-                            uid_assy_match = re.search(f'uid_assy_{j}="([^"]+)"', line)
-                            if uid_assy_match:
-                                uid_assy_list.append(uid_assy_match.group(1))
-                            else:
-                                uid_assy_list.append('')  # Keep columns aligned
-                        
-                        # Create uid group tuple
-                        uid_group = (uid_in, tuple(uid_assy_list))
-                        
-                        # Only append results if uid_in is found and this uid group hasn't been processed
-                        if uid_in and uid_group not in processed_uid_groups:
-                            print(file_path)
-                            station_name = extract_station_name_from_logs(file_path)  # Assuming extract_station_name_from_logs is defined elsewhere
-                            print(station_name)
-                            # Append drive_name, station_name, uid_in, and uid_assy_list
-                            result_message = [drive_name, station_name, uid_in] + uid_assy_list
-                            results.append(result_message)
-                            # Track processed uid group
-                            processed_uid_groups.add(uid_group)
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
-    
-    return results
-
-# Function to traverse directories and process files for UID extraction within a date range
-def traverse_directory_uids(root_dir, drive_name, search_terms, start_date, end_date, station_name, found_terms, temp_file, is_non_standard, n):
-    n = int(subassy_entry.get())
-    results = []
-    try:
-        print(f"Processing drive: {drive_name} at path: {root_dir}")
-        start_datetime = datetime.combine(start_date, time.min)
-        end_datetime = datetime.combine(end_date, time.max)
-
-        for root, dirs, files in os.walk(root_dir):
-            for file in files:
-
-                # Check for standard application logs
-                if not is_non_standard: 
-                # Match "VitescoAppMonitoringService.log." with date and version suffixes
-                    if (file.lower().startswith("vitescoappmonitoringservice.log.") or 
-                        file.lower().endswith("tracer.txt")) and station_name.lower() in root.lower():
-
-                        file_path = os.path.join(root, file)
-                        
-                        # Filter out 'old' and 'not_used' files
-                        if 'old' in file_path.lower() or 'not_used' in file_path.lower():
-                            continue
-                        
-                        # Verify date range
-                        file_mod_time = os.path.getmtime(file_path)
-                        file_date = datetime.fromtimestamp(file_mod_time)
-                        if start_datetime <= file_date <= end_datetime:
-                            print(f"Calling process_file_uids with file path: {file_path}")
-                            results.extend(process_file_uids(file_path, drive_name, search_terms, found_terms, temp_file, is_non_standard, n))
-                
-                # Check for non-standard application logs
-                else:
-                    if (file.lower().startswith("logging") or file.lower().endswith(".log")) and station_name.lower() in root.lower():
-
-                        file_path = os.path.join(root, file)
-                        
-                        # Filter out 'old' and 'not_used' files
-                        if 'old' in file_path.lower() or 'not_used' in file_path.lower():
-                            continue
-                        
-                        # Verify date range
-                        file_mod_time = os.path.getmtime(file_path)
-                        file_date = datetime.fromtimestamp(file_mod_time)
-                        if start_datetime <= file_date <= end_datetime:
-                            print(f"Calling process_file_uids with file path: {file_path}")
-                            results.extend(process_file_uids(file_path, drive_name, search_terms, found_terms, temp_file, is_non_standard, n))
-
-    except Exception as e:
-        print(f"Error traversing directory {root_dir}: {e}")
-    return results
+    # Run the search on a worker thread, the window stays responsive
+    start_search(run_uid_search, search_terms, start_date, end_date, station_name, selected_drive_paths(selected_drives), is_non_standard, n,
+                 output_path_uid, config, use_index, full_rescan, incremental)
 
 # Function to handle the search lines functionality
 def search_lines():
@@ -410,45 +130,124 @@ def search_lines():
     # Get the non-standard selection
     is_non_standard = non_standard_var.get()
 
-    results = []
-    found_terms = set()
+    # Get the full rescan selection
+    full_rescan = full_rescan_var.get()
 
-    # Create a temporary file to store found terms
-    with tempfile.NamedTemporaryFile(delete=False, mode='w') as temp_file:
-        temp_file_path = temp_file.name
+    # Get the new log data only selection
+    incremental = incremental_var.get()
 
-        for drive_name in selected_drives:
-            drive_path = production_pcs.get(drive_name)
-            if drive_path:
-                drive_results = traverse_directory(drive_path, drive_name, search_terms, start_date, end_date, station_name, found_terms, temp_file, is_non_standard)
-                results.extend(drive_results)
+    # Run the search on a worker thread, the window stays responsive
+    start_search(run_line_search, search_terms, start_date, end_date, station_name, selected_drive_paths(selected_drives), is_non_standard,
+                 output_path_lines, config, full_rescan, incremental)
 
-    not_found = set(search_terms) - found_terms
-    output_file_path = output_path_lines
-    try:
-        with open(output_file_path, 'w') as output_file:
-            for result in results:
-                output_file.write(result + "\n")
-            if not_found:
-                output_file.write(f"\nNot Found Search Terms: {', '.join(not_found)}\n")
-        messagebox.showinfo("Search Results", f"Results written to {output_file_path}")
-        unhide_window()
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not write to file: {e}")
-        unhide_window()
-
-    # Read the temporary file and compare with the original search terms
-    try:
-        with open(temp_file_path, 'r') as temp_file:
-            found_terms_in_file = set(temp_file.read().splitlines())
-        not_found_terms = set(search_terms) - found_terms_in_file
-        if not_found_terms:
-            messagebox.showinfo("Search Results", f"The following terms were not found: {', '.join(not_found_terms)}")
-    except Exception as e:
-        print(f"Error reading temporary file: {e}")
+# Function to handle the genealogy trace of the searched uids over every subassembly level
+def trace_genealogy():
+    # Get search terms from entry field
+    search_terms = search_entry.get().split(',')
+    if not search_terms:
+        messagebox.showwarning("Input Error", "Please enter search terms.")
+        return
+
+    # Get start and end dates from DateEntry widgets
+    start_date = start_date_entry.get_date()
+    end_date = end_date_entry.get_date()
+
+    if start_date > end_date:
+        messagebox.showwarning("Date Error", "End date must be greater than or equal to start date.")
+        return
 
-    # Delete the temporary file
-    os.remove(temp_file_path)
+    # Get selected drives from the checkboxes
+    selected_drives = [drive for drive, var in drive_vars.items() if var.get()]
+
+    # Trace from the units to their subassemblies, or forward from subassemblies to the units they went into
+    direction = 'forward' if forward_var.get() else 'backward'
+
+    # Run the search on a worker thread, the window stays responsive
+    start_search(run_genealogy_search, search_terms, start_date, end_date, selected_drive_paths(selected_drives), non_standard_var.get(),
+                 output_path_genealogy, config, direction, None, use_index_var.get(), full_rescan_var.get())
+
+# Function to get the (drive name, drive path) pairs of the selected drives
+def selected_drive_paths(selected_drives):
+    return [(drive_name, production_pcs[drive_name]) for drive_name in selected_drives if production_pcs.get(drive_name)]
+
+# Function to start a search on a worker thread and follow its progress in the window
+def start_search(run_search, *args):
+    if search_state['thread'] is not None:
+        return
+
+    progress = SearchProgress(max_live_result_lines)
+    cancel_event = threading.Event()
+    search_state.update(progress=progress, cancel_event=cancel_event, summary=None)
+
+    def worker():
+        try:
+            search_state['summary'] = run_search(*args, progress=progress, cancel_event=cancel_event)
+        except Exception as e:
+            logger.exception("Error running search: %s", e)
+            search_state['summary'] = {'error': f"Search failed: {e}"}
+
+    results_text.delete('1.0', tk.END)
+    lines_button.config(state=tk.DISABLED)
+    uids_button.config(state=tk.DISABLED)
+    genealogy_button.config(state=tk.DISABLED)
+    cancel_button.config(state=tk.NORMAL)
+
+    search_state['thread'] = threading.Thread(target=worker, daemon=True)
+    search_state['thread'].start()
+    root.after(200, poll_search)
+
+# Function to show the progress and the new results of the running search, called from the Tk event loop
+def poll_search():
+    progress = search_state['progress']
+    append_results(progress.take_results(1000))
+    progress_label.config(text=progress.describe())
+
+    if search_state['thread'].is_alive():
+        root.after(200, poll_search)
+    else:
+        finish_search()
+
+# Function to append result lines to the live results view, keeping only the most recent lines
+def append_results(new_results):
+    if not new_results:
+        return
+    results_text.insert(tk.END, '\n'.join(new_results) + '\n')
+    line_count = int(results_text.index('end-1c').split('.')[0])
+    if line_count > max_live_result_lines:
+        results_text.delete('1.0', f'{line_count - max_live_result_lines}.0')
+    results_text.see(tk.END)
+
+# Function to cancel the running search, drives stop at the next directory or file
+def cancel_search():
+    if search_state['cancel_event'] is not None:
+        search_state['cancel_event'].set()
+        cancel_button.config(state=tk.DISABLED)
+        progress_label.config(text="Cancelling search...")
+
+# Function to report the outcome of a finished search and enable the search buttons again
+def finish_search():
+    progress = search_state['progress']
+    append_results(progress.take_results())
+    progress_label.config(text=progress.describe())
+    summary = search_state['summary'] or {}
+    search_state.update(thread=None, cancel_event=None)
+
+    lines_button.config(state=tk.NORMAL)
+    uids_button.config(state=tk.NORMAL)
+    genealogy_button.config(state=tk.NORMAL)
+    cancel_button.config(state=tk.DISABLED)
+
+    if summary.get('error'):
+        messagebox.showerror("File Error", summary['error'])
+        return
+    if summary['report_empty'] and summary['result_count'] == 0:
+        messagebox.showinfo("Search Results", "No matching results found.")
+    elif summary['cancelled']:
+        messagebox.showinfo("Search Results", f"Search cancelled, partial results written to {summary['output_path']}")
+    else:
+        messagebox.showinfo("Search Results", f"Results written to {summary['output_path']}")
+    if summary['not_found']:
+        messagebox.showinfo("Search Results", f"The following terms were not found: {', '.join(summary['not_found'])}")
 
 # Function to select all checkboxes
 def select_all():
@@ -465,9 +264,12 @@ def select_csv_file():
     file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
     if file_path:
         try:
-            df = pd.read_csv(file_path)
+            search_terms = read_terms_file(file_path)
+            if not search_terms:
+                messagebox.showwarning("File Error", f"No search terms in {file_path}")
+                return
             search_entry.delete(0, tk.END)
-            search_entry.insert(0, ','.join(df['search_terms']))
+            search_entry.insert(0, ','.join(search_terms))
         except Exception as e:
             messagebox.showerror("File Error", f"Error reading CSV file: {e}")
 
@@ -530,8 +332,23 @@ non_standard_var = tk.BooleanVar()
 non_standard_chk = tk.Checkbutton(date_frame, text="GHP Common", variable=non_standard_var, font=("Arial", 14))
 non_standard_chk.pack(side=tk.LEFT, padx=(20, 5))
 
+# Checkbox for answering SN pair searches from the UID index
+use_index_var = tk.BooleanVar()
+use_index_chk = tk.Checkbutton(date_frame, text="Use UID index", variable=use_index_var, font=("Arial", 14))
+use_index_chk.pack(side=tk.LEFT, padx=(20, 5))
+
+# Checkbox for listing every directory again instead of using the cached listings
+full_rescan_var = tk.BooleanVar()
+full_rescan_chk = tk.Checkbutton(date_frame, text="Full rescan", variable=full_rescan_var, font=("Arial", 14))
+full_rescan_chk.pack(side=tk.LEFT, padx=(20, 5))
+
+# Checkbox for reading only the log data added since the last run of the same search, the new results are appended to the output
+incremental_var = tk.BooleanVar()
+incremental_chk = tk.Checkbutton(date_frame, text="Only new log data", variable=incremental_var, font=("Arial", 14))
+incremental_chk.pack(side=tk.LEFT, padx=(20, 5))
+
 # Drive selection
-production_pcs = read_production_pcs(production_pc_source)
+production_pcs = read_production_pcs(production_pc_source, config['production_pc_cache_path'])
 
 drive_frame = tk.Frame(root)
 drive_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -580,8 +397,18 @@ for col in range(max_columns):
 button_frame = tk.Frame(root)
 button_frame.pack(pady=20)
 
-tk.Button(button_frame, text="Search and output lines", command=line_hide_combine, font=("Arial", 14)).pack(side=tk.LEFT, padx=10)
-tk.Button(button_frame, text="Search and output SN Pairs", command=uid_hide_combine, font=("Arial", 14)).pack(side=tk.LEFT, padx=10)
+lines_button = tk.Button(button_frame, text="Search and output lines", command=search_lines, font=("Arial", 14))
+lines_button.pack(side=tk.LEFT, padx=10)
+uids_button = tk.Button(button_frame, text="Search and output SN Pairs", command=search_and_output_uids, font=("Arial", 14))
+uids_button.pack(side=tk.LEFT, padx=10)
+genealogy_button = tk.Button(button_frame, text="Trace genealogy", command=trace_genealogy, font=("Arial", 14))
+genealogy_button.pack(side=tk.LEFT, padx=10)
+
+# Checkbox for tracing the genealogy forward, from subassemblies to the units they were built into
+forward_var = tk.BooleanVar()
+tk.Checkbutton(button_frame, text="Forward", variable=forward_var, font=("Arial", 14)).pack(side=tk.LEFT, padx=(0, 10))
+cancel_button = tk.Button(button_frame, text="Cancel", command=cancel_search, font=("Arial", 14), state=tk.DISABLED)
+cancel_button.pack(side=tk.LEFT, padx=10)
 
 # Number of subassemblies input
 tk.Label(button_frame, text="Number of subassys", font=("Arial", 14)).pack(side=tk.RIGHT)
@@ -590,5 +417,19 @@ subassy_entry.pack(side=tk.RIGHT, padx=10)
 
 # Set default text '1'
 subassy_entry.insert(0, "1")
+
+# Progress of the running search
+progress_label = tk.Label(root, text="", font=("Arial", 12), anchor='w')
+progress_label.pack(fill=tk.X, padx=10)
+
+# Live view of the results found so far
+results_frame = tk.Frame(root)
+results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+results_scrollbar = tk.Scrollbar(results_frame, orient="vertical")
+results_text = tk.Text(results_frame, height=10, font=("Consolas", 10), yscrollcommand=results_scrollbar.set)
+results_scrollbar.config(command=results_text.yview)
+results_scrollbar.pack(side="right", fill="y")
+results_text.pack(side="left", fill="both", expand=True)
  
+logger.info("Window ready in %.2f s", perf_counter() - startup_started)
 root.mainloop()
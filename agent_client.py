@@ -0,0 +1,102 @@
+import json
+import socket
+
+# Version of the messages between the search and the agents, an agent with another version is not used
+AGENT_PROTOCOL_VERSION = 1
+
+# Port the search agent listens on unless told otherwise
+DEFAULT_AGENT_PORT = 8765
+
+# Seconds a read from an agent waits before checking whether the search was stopped
+AGENT_POLL_SECONDS = 0.5
+
+# Size of the blocks read from an agent connection
+AGENT_RECV_SIZE = 64 * 1024
+
+# Raised when no agent answers for a drive, the drive is then searched over the share
+class AgentUnavailable(Exception):
+    pass
+
+# Function to send a message as one line of JSON
+def send_message(connection, message):
+    connection.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+# Function to read the JSON line messages of a connection until it is closed or the stop_event is set.
+# None is yielded whenever a read timed out without a complete message.
+def iter_messages(connection, stop_event=None):
+    buffer = bytearray()
+    while True:
+        newline = buffer.find(b'\n')
+        if newline >= 0:
+            line = bytes(buffer[:newline])
+            del buffer[:newline + 1]
+            yield json.loads(line)
+            continue
+        if stop_event is not None and stop_event.is_set():
+            return
+        try:
+            data = connection.recv(AGENT_RECV_SIZE)
+        except socket.timeout:
+            yield None
+            continue
+        if not data:
+            raise ConnectionError("the agent closed the connection")
+        buffer += data
+
+# Function to get the agent address of a drive as (host, port), or None when it is searched over the share.
+# agent_hosts maps drive names to "host:port", other drives use the agent_port of the production PC of a UNC drive path.
+def agent_address(config, drive_name, drive_path):
+    address = config['agent_hosts'].get(drive_name)
+    if address:
+        host, separator, port = address.rpartition(':')
+        return (host, int(port)) if separator else (address, config['agent_port'] or DEFAULT_AGENT_PORT)
+    path = str(drive_path)
+    if not config['agent_port'] or not path.startswith(('\\\\', '//')):
+        return None
+    return path.replace('/', '\\').lstrip('\\').split('\\', 1)[0], config['agent_port']
+
+# Function to run a search on the agent of a production PC, it reads the logs locally and sends back only the matching records.
+# The results go to the writer and the found terms to found_terms like in traverse_directory, the number of results is returned.
+# Raises AgentUnavailable when the agent cannot be reached or refuses the search, before any result was written.
+def search_via_agent(address, request, writer, found_terms, stop_event=None, progress=None, connect_timeout=2):
+    try:
+        connection = socket.create_connection(address, timeout=connect_timeout)
+    except OSError as e:
+        raise AgentUnavailable(str(e))
+
+    with connection:
+        messages = iter_messages(connection, stop_event)
+        try:
+            send_message(connection, dict(request, version=AGENT_PROTOCOL_VERSION))
+            hello = next(messages, None)
+        except (OSError, ValueError) as e:
+            raise AgentUnavailable(str(e))
+        if hello is None:
+            if stop_event is not None and stop_event.is_set():
+                return 0
+            raise AgentUnavailable("no answer")
+        if hello.get('error') or hello.get('version') != AGENT_PROTOCOL_VERSION:
+            raise AgentUnavailable(hello.get('error') or f"unexpected answer {hello}")
+
+        # An agent reading files without matches is silent for a while, the reads wait in short steps to notice a stop
+        connection.settimeout(AGENT_POLL_SECONDS)
+        result_count = 0
+        files_found = files_done = bytes_done = 0
+        for message in messages:
+            if message is None:
+                continue
+            if 'results' in message:
+                writer.write_results(message['results'], message.get('seen_time'))
+                result_count += len(message['results'])
+            elif 'progress' in message:
+                counts = message['progress']
+                if progress is not None:
+                    progress.add_file_counts(counts['files_found'] - files_found, counts['files_done'] - files_done,
+                                             counts['bytes_done'] - bytes_done)
+                files_found, files_done, bytes_done = counts['files_found'], counts['files_done'], counts['bytes_done']
+            elif 'error' in message:
+                raise RuntimeError(f"search agent at {address[0]}:{address[1]}: {message['error']}")
+            elif message.get('done'):
+                found_terms.update(message['found_terms'])
+                break
+        return result_count
@@ -0,0 +1,107 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drive_walker import PathClassifier, archive_kind, is_log_file, is_log_archive, is_pruned_directory, LINE_SEARCH_EXCLUDES
+from search_engine import extract_station_name_from_logs, station_name_of_directory, STATION_FOLDER_PATTERN, STATION_NAME_PATTERN
+
+# Parts the synthetic file names are made of, logs, archives, excluded and unrelated files mixed
+NAME_PARTS = ['VitescoAppMonitoringService.log.', '2024-10-28', 'Logging_', '_Tracer.txt', '.log', 'old', 'not_used',
+              'report', '.csv', '.gz', '.zip', '.tar.gz', '_1', 'backup']
+
+# Function to decide a file the way walk_log_files used to, with the name lowered and checked rule by rule
+def file_kind_per_rule(name, is_non_standard, excludes, include_archives):
+    name_lower = name.lower()
+    kind = archive_kind(name_lower)
+    if kind is None:
+        if not is_log_file(name_lower, is_non_standard):
+            return None
+    elif not include_archives or not is_log_archive(name_lower, is_non_standard):
+        return None
+    if any(word in name_lower for word in excludes):
+        return None
+    return kind or 'log'
+
+# Function to decide a file with the classifier the way walk_log_files does now
+def file_kind_classified(classifier, name, include_archives):
+    kind = classifier.file_kind(name)
+    return None if kind is None or (kind != 'log' and not include_archives) else kind
+
+# Function to extract the station name the way process_file_uids used to, both patterns on the whole path of every line
+def station_name_per_line(file_path):
+    match = STATION_FOLDER_PATTERN.search(file_path)
+    if match:
+        match_station = STATION_NAME_PATTERN.search(match.group(1))
+        if match_station:
+            return match_station.group(1)
+    return "Unknown Station"
+
+# Function to build the file names and the directory paths of a large drive.
+# The names are drawn from distinct_names random names, like the rotated logs that repeat in every station folder.
+def make_tree(names, distinct_names, directories, seed=1):
+    rng = random.Random(seed)
+    name_pool = [''.join(rng.choice(NAME_PARTS) for _ in range(rng.randint(1, 4))) for _ in range(distinct_names)]
+    file_names = [rng.choice(name_pool) for _ in range(names)]
+    dir_paths = [os.path.join('\\\\PC01\\D$', f'Line{index % 7}', f'01_ST_{index % 50:02d}', 'Logs' if index % 3 else 'old', str(index))
+                 for index in range(directories)]
+    return file_names, dir_paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-rule path checks of the walker with the precompiled PathClassifier")
+    parser.add_argument('--names', type=int, default=200000, help="file names classified per measurement")
+    parser.add_argument('--distinct-names', type=int, default=5000, help="different file names among them")
+    parser.add_argument('--directories', type=int, default=20000, help="directories classified per measurement")
+    parser.add_argument('--lines', type=int, default=200000, help="matched lines that take the station of their file")
+    parser.add_argument('--repeat', type=int, default=3, help="measurements per case, the best one is reported")
+    args = parser.parse_args()
+
+    file_names, dir_paths = make_tree(args.names, args.distinct_names, args.directories)
+    station_lower = '01_st_'
+
+    print(f"{'check':<28} {'per rule (checks/s)':>20} {'classifier (checks/s)':>22} {'speedup':>8}")
+    for is_non_standard in (False, True):
+        for include_archives in (False, True):
+            classifier = PathClassifier('01_ST_', is_non_standard, LINE_SEARCH_EXCLUDES)
+            assert all(file_kind_classified(classifier, name, include_archives)
+                       == file_kind_per_rule(name, is_non_standard, LINE_SEARCH_EXCLUDES, include_archives) for name in file_names)
+            timings = [
+                min(timeit.repeat(lambda: [file_kind_per_rule(name, is_non_standard, LINE_SEARCH_EXCLUDES, include_archives)
+                                           for name in file_names], number=1, repeat=args.repeat)),
+                min(timeit.repeat(lambda: [file_kind_classified(classifier, name, include_archives) for name in file_names],
+                                  number=1, repeat=args.repeat)),
+            ]
+            label = f"files {'ghp' if is_non_standard else 'std'}{' +archives' if include_archives else ''}"
+            print(f"{label:<28} {args.names / timings[0]:>20,.0f} {args.names / timings[1]:>22,.0f} {timings[0] / timings[1]:>7.1f}x")
+
+    # Every directory is checked when it is met as a subdirectory and again when its entries are listed
+    def directories_per_rule():
+        for dir_path in dir_paths:
+            is_pruned_directory(dir_path.lower(), LINE_SEARCH_EXCLUDES)
+            station_lower in dir_path.lower()
+
+    def directories_classified():
+        classifier = PathClassifier('01_ST_', False, LINE_SEARCH_EXCLUDES)
+        for dir_path in dir_paths:
+            classifier.directory(dir_path)
+
+    classifier = PathClassifier('01_ST_', False, LINE_SEARCH_EXCLUDES)
+    assert all(classifier.directory(dir_path) == (
+        is_pruned_directory(dir_path.lower(), LINE_SEARCH_EXCLUDES),
+        station_lower in dir_path.lower()) for dir_path in dir_paths)
+    timings = [min(timeit.repeat(check, number=1, repeat=args.repeat)) for check in (directories_per_rule, directories_classified)]
+    print(f"{'directories':<28} {args.directories / timings[0]:>20,.0f} {args.directories / timings[1]:>22,.0f} {timings[0] / timings[1]:>7.1f}x")
+
+    # The matched lines of a file all take the station of the same directory
+    file_paths = [os.path.join(dir_paths[index % 100], 'VitescoAppMonitoringService.log.1') for index in range(args.lines)]
+    assert all(extract_station_name_from_logs(file_path) == station_name_per_line(file_path) for file_path in file_paths)
+    station_name_of_directory.cache_clear()
+    timings = [min(timeit.repeat(lambda: [extract(file_path) for file_path in file_paths], number=1, repeat=args.repeat))
+               for extract in (station_name_per_line, extract_station_name_from_logs)]
+    print(f"{'station of matched lines':<28} {args.lines / timings[0]:>20,.0f} {args.lines / timings[1]:>22,.0f} {timings[0] / timings[1]:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_tree import generate_log_tree
+from log_matching import TermMatcher
+from drive_walker import walk_log_files, LINE_SEARCH_EXCLUDES
+from search_engine import process_file, process_file_uids, traverse_directory, traverse_directory_uids, SearchProgress
+from parse_pool import ParsePool
+from result_writers import open_output, LineResultWriter, UidCsvWriter
+
+# Function to run a stage once and return (seconds, peak traced memory in bytes or None, progress).
+# The results are written to the null device and only counted, not kept for a live view.
+def measure(stage, subassys, trace_memory):
+    progress = SearchProgress(max_live_results=0)
+    with open_output(os.devnull) as null_file:
+        writers = {'lines': LineResultWriter(null_file, progress), 'uids': UidCsvWriter(null_file, subassys, progress)}
+        if trace_memory:
+            tracemalloc.start()
+        started = perf_counter()
+        stage(progress, writers)
+        elapsed = perf_counter() - started
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return elapsed, peak, progress
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the traversal and parsing paths on a synthetic production log tree")
+    parser.add_argument('--root', help="directory for the generated tree (default: a temporary directory that is removed afterwards)")
+    parser.add_argument('--drives', type=int, default=2)
+    parser.add_argument('--lines-per-drive', type=int, default=2)
+    parser.add_argument('--stations-per-line', type=int, default=3)
+    parser.add_argument('--files-per-station', type=int, default=4)
+    parser.add_argument('--ghp-files-per-station', type=int, default=2)
+    parser.add_argument('--file-size-kb', type=int, default=256)
+    parser.add_argument('--subassys', type=int, default=2)
+    parser.add_argument('--uid-ratio', type=float, default=0.05, help="share of log lines that are unit results")
+    parser.add_argument('--terms', type=int, nargs='+', default=[1, 100, 2000], help="search term counts to measure")
+    parser.add_argument('--processes', type=int, default=0, help="parse the files of the traverse stages in this many processes (default: on the thread)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case, the best one is reported")
+    parser.add_argument('--no-memory', action='store_true', help="skip the extra run that measures peak memory")
+    parser.add_argument('--json', help="also write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix='unitid_bench_')
+    try:
+        started = perf_counter()
+        tree = generate_log_tree(root, args.drives, args.lines_per_drive, args.stations_per_line, args.files_per_station,
+                                 args.ghp_files_per_station, args.file_size_kb * 1024, args.subassys, args.uid_ratio)
+        print(f"Generated {tree.files} files, {tree.bytes / 1e6:.1f} MB, {len(tree.uids)} searchable uids "
+              f"in {perf_counter() - started:.1f} s under {root}")
+
+        today = datetime.now().date()
+        start_date = today - timedelta(days=max(args.files_per_station, args.ghp_files_per_station) + 1)
+        start_datetime = datetime.combine(start_date, datetime.min.time())
+        end_datetime = datetime.combine(today, datetime.max.time())
+        drives = tree.drive_paths()
+
+        # The files a standard search reads, for timing the file processing on its own
+        files = [(drive_name, file_path, file_stat)
+                 for drive_name, drive_path in drives
+                 for file_path, file_stat in walk_log_files(drive_path, '', False, start_datetime, end_datetime, LINE_SEARCH_EXCLUDES)]
+
+        measurements = []
+        print(f"{'stage':<24} {'terms':>6} {'files':>6} {'MB':>8} {'seconds':>8} {'files/s':>9} {'MB/s':>7} {'peak MiB':>9} {'matches':>8}")
+        for term_count in args.terms:
+            matcher = TermMatcher(tree.search_terms(term_count))
+            # The processes are started before the timed runs, like a search does once for all its drives
+            parse_pool = ParsePool(args.processes, matcher, args.subassys) if args.processes > 0 else None
+
+            def run_traverse_directory(progress, writers):
+                for drive_name, drive_path in drives:
+                    traverse_directory(drive_path, drive_name, matcher, start_date, today, '', set(), writers['lines'], False,
+                                       progress=progress, parse_pool=parse_pool)
+
+            def run_traverse_directory_uids(progress, writers):
+                for drive_name, drive_path in drives:
+                    traverse_directory_uids(drive_path, drive_name, matcher, start_date, today, '', set(), writers['uids'], False,
+                                            args.subassys, progress=progress, parse_pool=parse_pool)
+
+            def run_process_file(progress, writers):
+                for drive_name, file_path, file_stat in files:
+                    process_file(file_path, drive_name, matcher, set(), writers['lines'], False)
+                    progress.file_done(file_stat.st_size)
+
+            def run_process_file_uids(progress, writers):
+                for drive_name, file_path, file_stat in files:
+                    process_file_uids(file_path, drive_name, matcher, set(), writers['uids'], False, args.subassys)
+                    progress.file_done(file_stat.st_size)
+
+            for stage_name, stage in (('traverse_directory', run_traverse_directory),
+                                      ('traverse_directory_uids', run_traverse_directory_uids),
+                                      ('process_file', run_process_file),
+                                      ('process_file_uids', run_process_file_uids)):
+                runs = [measure(stage, args.subassys, False) for _ in range(args.repeat)]
+                elapsed, _, progress = min(runs, key=lambda run: run[0])
+                peak = None if args.no_memory else measure(stage, args.subassys, True)[1]
+
+                megabytes = progress.bytes_done / 1e6
+                measurement = {
+                    'stage': stage_name,
+                    'terms': term_count,
+                    'processes': args.processes,
+                    'files': progress.files_done,
+                    'megabytes': megabytes,
+                    'seconds': elapsed,
+                    'files_per_second': progress.files_done / elapsed,
+                    'megabytes_per_second': megabytes / elapsed,
+                    'peak_memory_bytes': peak,
+                    'matches': progress.matches,
+                }
+                measurements.append(measurement)
+                peak_text = '-' if peak is None else f"{peak / 2 ** 20:.1f}"
+                print(f"{stage_name:<24} {term_count:>6} {progress.files_done:>6} {megabytes:>8.1f} {elapsed:>8.2f} "
+                      f"{measurement['files_per_second']:>9.1f} {measurement['megabytes_per_second']:>7.1f} {peak_text:>9} {progress.matches:>8}")
+            if parse_pool is not None:
+                parse_pool.shutdown()
+
+        if args.json:
+            with open(args.json, 'w') as json_file:
+                json.dump({'files': tree.files, 'bytes': tree.bytes, 'measurements': measurements}, json_file, indent=2)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
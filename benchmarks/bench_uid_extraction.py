@@ -0,0 +1,49 @@
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_matching import extract_uid_fields
+
+# Function to extract the UID fields the way process_file_uids used to, one regex per field
+def extract_uid_fields_per_field(line, n):
+    uid_in_match = re.search(r'uid_in="([^"]+)"', line)
+    uid_in = uid_in_match.group(1) if uid_in_match else None
+    uid_assy_list = []
+    for j in range(1, n + 1):
+        uid_assy_match = re.search(f'uid_assy_{j}="([^"]+)"', line)
+        if uid_assy_match:
+            uid_assy_list.append(uid_assy_match.group(1))
+        else:
+            uid_assy_list.append('')
+    return uid_in, uid_assy_list
+
+# Function to build a unit result line like the ones written by the stations
+def make_line(n):
+    assy = ' '.join(f'uid_assy_{j}="A{j:02d}X123456789"' for j in range(1, n + 1))
+    return (f'2024-10-28 15:38:17,053 INFO UNIT_RESULT station="ST1" result="PASS" '
+            f'uid_in="U123456789012" {assy} cycle_time="12.5"\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-field regex UID extraction with the single-pass extractor")
+    parser.add_argument('--lines', type=int, default=20000, help="lines parsed per measurement")
+    parser.add_argument('--repeat', type=int, default=5, help="measurements per case, the best one is reported")
+    parser.add_argument('--subassys', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="subassembly counts to measure")
+    args = parser.parse_args()
+
+    print(f"{'n':>4} {'per-field (lines/s)':>22} {'single-pass (lines/s)':>24} {'speedup':>8}")
+    for n in args.subassys:
+        line = make_line(n)
+        assert extract_uid_fields(line, n) == extract_uid_fields_per_field(line, n)
+
+        timings = []
+        for extract in (extract_uid_fields_per_field, extract_uid_fields):
+            best = min(timeit.repeat(lambda: extract(line, n), number=args.lines, repeat=args.repeat))
+            timings.append(args.lines / best)
+        print(f"{n:>4} {timings[0]:>22,.0f} {timings[1]:>24,.0f} {timings[1] / timings[0]:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
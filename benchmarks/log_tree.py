@@ -0,0 +1,114 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+# Log messages written between the unit results
+FILLER_MESSAGES = [
+    'INFO [Worker-{thread}] PLC heartbeat received, state="RUNNING" cycle="{cycle}"',
+    'DEBUG [Worker-{thread}] Reading carrier position="{cycle}" conveyor="IN"',
+    'INFO [Worker-{thread}] Recipe loaded name="STD_{cycle}" version="3.2.1"',
+    'WARN [Worker-{thread}] Torque close to limit value="{cycle}.5" limit="{cycle}.9"',
+    'INFO [Worker-{thread}] Vision inspection finished result="OK" duration_ms="{cycle}"',
+]
+
+# Class for the synthetic production log tree and the serial numbers planted in it
+class LogTree:
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.drives = []
+        self.stations = []
+        self.uids = []
+        self.files = 0
+        self.bytes = 0
+
+    # Function to get the (drive name, drive path) pairs of the generated drives
+    def drive_paths(self):
+        return [(drive_name, os.path.join(self.root_dir, drive_name)) for drive_name in self.drives]
+
+    # Function to pick search terms, found_ratio of them are planted uids and the rest are not in any file
+    def search_terms(self, term_count, found_ratio=0.5, seed=1):
+        rng = random.Random(seed)
+        found_count = min(int(term_count * found_ratio), len(self.uids))
+        terms = rng.sample(self.uids, found_count)
+        terms += [f'X{rng.randrange(10 ** 11, 10 ** 12)}' for _ in range(term_count - found_count)]
+        rng.shuffle(terms)
+        return terms
+
+# Function to build a unit result line and the line that follows it
+def unit_result_lines(timestamp, uid_in, subassys, rng):
+    assy = ' '.join(f'uid_assy_{j}="A{j}{rng.randrange(10 ** 10, 10 ** 11)}"' for j in range(1, subassys + 1))
+    result = rng.choice(['PASS', 'PASS', 'PASS', 'FAIL'])
+    return [
+        f'{timestamp} INFO [Worker-1] UNIT_RESULT station="ST" result="{result}" uid_in="{uid_in}" {assy} cycle_time="12.5"',
+        f'{timestamp} INFO [Worker-1] UNIT_RESULT_DETAIL measurements="42" failed_steps="{0 if result == "PASS" else 3}"',
+    ]
+
+# Function to write one log file of about file_size bytes, unit results make up uid_ratio of its lines.
+# Only the uids of files a standard search reads are offered as search terms.
+def write_log_file(file_path, file_size, start_time, subassys, uid_ratio, tree, rng, searchable=True):
+    written = 0
+    timestamp = start_time
+    with open(file_path, 'w', newline='\n') as log_file:
+        while written < file_size:
+            timestamp += timedelta(milliseconds=rng.randrange(50, 2000))
+            stamp = timestamp.strftime('%Y-%m-%d %H:%M:%S,') + f'{timestamp.microsecond // 1000:03d}'
+            if rng.random() < uid_ratio:
+                uid_in = f'U{rng.randrange(10 ** 11, 10 ** 12)}'
+                if searchable:
+                    tree.uids.append(uid_in)
+                lines = unit_result_lines(stamp, uid_in, subassys, rng)
+            else:
+                message = rng.choice(FILLER_MESSAGES).format(thread=rng.randrange(1, 9), cycle=rng.randrange(1000))
+                lines = [f'{stamp} {message}']
+            text = '\n'.join(lines) + '\n'
+            log_file.write(text)
+            written += len(text)
+    tree.files += 1
+    tree.bytes += written
+    return timestamp
+
+# Function to generate a production log tree:
+#   <root>/<drive>/Line<k>/<x>_<y>_<Station>/Logs/VitescoAppMonitoringService.log.<date>.<n> and <station>_tracer.txt
+#   <root>/<drive>/Line<k>/<x>_<y>_<Station>/GHP/Logs/logging_<n>.log for the GHP Common logs
+#   plus old and not_used folders that a search has to skip.
+# File mtimes are spread over the days before end_date, one rotated log per day.
+def generate_log_tree(root_dir, drives=2, lines_per_drive=2, stations_per_line=3, files_per_station=4,
+                      ghp_files_per_station=2, file_size=256 * 1024, subassys=2, uid_ratio=0.05,
+                      end_date=None, seed=1):
+    rng = random.Random(seed)
+    tree = LogTree(root_dir)
+    end_date = end_date or datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    for d in range(drives):
+        drive_name = f'PC{d + 1:02d}'
+        tree.drives.append(drive_name)
+        for k in range(lines_per_drive):
+            for s in range(stations_per_line):
+                station = f'ST{d + 1}{k + 1}{s + 1}'
+                tree.stations.append(station)
+                station_dir = os.path.join(root_dir, drive_name, f'Line{k + 1}', f'{k + 1}_{s + 1}_{station}')
+                logs_dir = os.path.join(station_dir, 'Logs')
+                ghp_dir = os.path.join(station_dir, 'GHP', 'Logs')
+                for directory in (logs_dir, ghp_dir, os.path.join(logs_dir, 'old'), os.path.join(logs_dir, 'not_used')):
+                    os.makedirs(directory, exist_ok=True)
+
+                for f in range(files_per_station):
+                    day = end_date - timedelta(days=files_per_station - 1 - f)
+                    name = f'VitescoAppMonitoringService.log.{day:%Y-%m-%d}.{f}'
+                    for directory in (logs_dir, os.path.join(logs_dir, 'old')):
+                        file_path = os.path.join(directory, name)
+                        write_log_file(file_path, file_size, day - timedelta(hours=8), subassys, uid_ratio, tree, rng,
+                                       searchable=directory == logs_dir)
+                        os.utime(file_path, (day.timestamp(), day.timestamp()))
+
+                tracer_path = os.path.join(logs_dir, f'{station}_tracer.txt')
+                write_log_file(tracer_path, file_size, end_date - timedelta(hours=8), subassys, uid_ratio, tree, rng)
+                os.utime(tracer_path, (end_date.timestamp(), end_date.timestamp()))
+
+                for f in range(ghp_files_per_station):
+                    day = end_date - timedelta(days=ghp_files_per_station - 1 - f)
+                    file_path = os.path.join(ghp_dir, f'logging_{f}.log')
+                    write_log_file(file_path, file_size, day - timedelta(hours=8), subassys, uid_ratio, tree, rng,
+                                   searchable=False)
+                    os.utime(file_path, (day.timestamp(), day.timestamp()))
+    return tree
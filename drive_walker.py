@@ -0,0 +1,321 @@
+import json
+import logging
+import os
+import re
+from collections import namedtuple
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# Words that exclude a file or a whole directory from the search when they appear in its path
+LINE_SEARCH_EXCLUDES = ('old', 'not_used', 'not used')
+UID_SEARCH_EXCLUDES = ('old', 'not_used')
+
+# Suffixes of single compressed log files, and of archives that can hold several log files
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz')
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tgz', '.tar.gz', '.tar.bz2', '.tar.xz')
+
+# Version of the manifest layout, manifests written with another layout are listed again
+MANIFEST_VERSION = 4
+
+# Class to count what a walk over a drive visited
+class WalkStats:
+    def __init__(self):
+        self.dirs_visited = 0
+        self.files_visited = 0
+        self.dirs_pruned = 0
+        self.files_matched = 0
+        self.errors = 0
+        # Files that were no candidates: not a log by name or excluded, outside the station, modified outside the date range
+        self.files_skipped_name = 0
+        self.files_skipped_station = 0
+        self.files_skipped_date = 0
+        # Seconds spent listing directories and reading file status, without the time the candidates were processed
+        self.seconds = 0.0
+
+    def __str__(self):
+        return (f"visited {self.dirs_visited} directories and {self.files_visited} files, "
+                f"pruned {self.dirs_pruned} directories, matched {self.files_matched} files, {self.errors} errors")
+
+    # Function to get the counts for a run report
+    def as_dict(self):
+        return dict(vars(self), seconds=round(self.seconds, 3))
+
+# File status kept in a directory manifest, with the fields of os.stat_result the search uses
+CachedStat = namedtuple('CachedStat', ['st_size', 'st_mtime'])
+
+# Class for a file listed from a directory manifest, it offers the part of os.DirEntry the walker uses.
+# file_record is the [name, size, mtime] of the file in the manifest. Its status is read from the file again
+# when fresh is set or nothing is cached, and kept in the manifest.
+class CachedEntry:
+    def __init__(self, manifest, dir_path, file_record, fresh):
+        self.manifest = manifest
+        self.name = file_record[0]
+        self.path = os.path.join(dir_path, self.name)
+        self.file_record = file_record
+        self.fresh = fresh
+
+    def stat(self):
+        name, size, mtime = self.file_record
+        if size is not None and not self.fresh:
+            return CachedStat(size, mtime)
+        file_stat = os.stat(self.path)
+        if [file_stat.st_size, file_stat.st_mtime] != [size, mtime]:
+            self.file_record[1:] = [file_stat.st_size, file_stat.st_mtime]
+            self.manifest.changed = True
+        return file_stat
+
+# Class for the cached directory listings of one drive. A directory is listed again only when its mtime changed,
+# the size and mtime of the log files in it are kept along with the listing.
+# Appending to a file does not change the mtime of its directory, so a file that can still grow has its status read again:
+# the newest file of a directory, which is the log being written after a rotation, and every file modified since the
+# start of the search range, which the walker takes as a candidate and reads up to its current size.
+class DirectoryManifest:
+    def __init__(self, manifest_path, root_dir, full_rescan=False):
+        self.manifest_path = manifest_path
+        self.root_dir = str(root_dir)
+        self.directories = {}
+        self.changed = False
+        self.dirs_relisted = 0
+        self.dirs_reused = 0
+
+        if not full_rescan and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as manifest_file:
+                    data = json.load(manifest_file)
+                if data.get('root_dir') == self.root_dir and data.get('version') == MANIFEST_VERSION:
+                    self.directories = data.get('directories', {})
+            except (OSError, ValueError) as e:
+                logger.warning("Error reading directory manifest %s: %s", manifest_path, e)
+
+    # Function to list a directory as (subdirectory paths, file entries), from the manifest if it is unchanged.
+    # since is the start timestamp of the search range.
+    def list_directory(self, dir_path, since):
+        dir_mtime = os.stat(dir_path).st_mtime
+        cached = self.directories.get(dir_path)
+        relisted = cached is None or cached['mtime'] != dir_mtime
+        if relisted:
+            cached = self._scan(dir_path, dir_mtime)
+            self.dirs_relisted += 1
+        else:
+            self.dirs_reused += 1
+
+        subdirs = [os.path.join(dir_path, name) for name in cached['dirs']]
+        newest = max((mtime for name, size, mtime in cached['files'] if mtime is not None), default=None)
+        files = []
+        for file_record in cached['files']:
+            mtime = file_record[2]
+            fresh = not relisted and mtime is not None and (mtime >= since or mtime == newest)
+            files.append(CachedEntry(self, dir_path, file_record, fresh))
+        return subdirs, files
+
+    # Function to list a directory with the status of the files that can be logs of either kind, or archives of them.
+    # The status of a directory listed again is not read a second time in the same walk.
+    def _scan(self, dir_path, dir_mtime):
+        dirs = []
+        files = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        dirs.append(entry.name)
+                    continue
+                name_lower = entry.name.lower()
+                size = mtime = None
+                if is_log_file(name_lower, False) or is_log_file(name_lower, True) or archive_kind(name_lower):
+                    try:
+                        file_stat = entry.stat()
+                        size, mtime = file_stat.st_size, file_stat.st_mtime
+                    except OSError as e:
+                        logger.warning("Error reading file status %s: %s", entry.path, e)
+                files.append([entry.name, size, mtime])
+
+        cached = {'mtime': dir_mtime, 'dirs': dirs, 'files': files}
+        self.directories[dir_path] = cached
+        self.changed = True
+        return cached
+
+    # Function to write the manifest back to disk if anything changed
+    def save(self):
+        if not self.changed:
+            return
+        temp_path = self.manifest_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as manifest_file:
+                json.dump({'version': MANIFEST_VERSION, 'root_dir': self.root_dir, 'directories': self.directories}, manifest_file)
+            os.replace(temp_path, self.manifest_path)
+            self.changed = False
+        except OSError as e:
+            logger.warning("Error writing directory manifest %s: %s", self.manifest_path, e)
+
+# Function to open the directory manifest of a drive in the manifest cache directory
+def open_drive_manifest(cache_dir, drive_name, root_dir, full_rescan=False):
+    os.makedirs(cache_dir, exist_ok=True)
+    file_name = re.sub(r'[^\w.-]', '_', str(drive_name)) + '.json'
+    return DirectoryManifest(os.path.join(cache_dir, file_name), root_dir, full_rescan)
+
+# Function to list a directory as (subdirectory paths, file entries) with os.scandir
+def list_directory(dir_path):
+    subdirs = []
+    files = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+                continue
+            files.append(entry)
+    return subdirs, files
+
+# Function to check the filename rules of the standard and the GHP Common (non-standard) logs
+def is_log_file(name_lower, is_non_standard):
+    if is_non_standard:
+        return name_lower.startswith("logging") or name_lower.endswith(".log")
+    # Match "VitescoAppMonitoringService.log." with date and version suffixes
+    return name_lower.startswith("vitescoappmonitoringservice.log.") or name_lower.endswith("tracer.txt")
+
+# Function to tell archives ('archive', several files) and compressed files ('compressed', one file) from other files
+def archive_kind(name_lower):
+    if name_lower.endswith(ARCHIVE_SUFFIXES):
+        return 'archive'
+    if name_lower.endswith(COMPRESSED_SUFFIXES):
+        return 'compressed'
+    return None
+
+# Function to check whether an archive can hold logs. A compressed file must be a log by the name it had
+# before compression, the files in an archive are checked by their own names when the archive is read.
+def is_log_archive(name_lower, is_non_standard):
+    kind = archive_kind(name_lower)
+    if kind == 'compressed':
+        return is_log_file(os.path.splitext(name_lower)[0], is_non_standard)
+    return kind == 'archive'
+
+# Function to check whether a directory and everything below it can be skipped, because of an exclusion word in its path.
+# The station is checked against the directory of each file, a Logs folder can hold station folders below it.
+def is_pruned_directory(dir_path_lower, excludes):
+    return any(word in dir_path_lower for word in excludes)
+
+# Most names that the classifier remembers per search, beyond that new names are decided without being kept
+CLASSIFIER_MEMO_SIZE = 100000
+
+# Class to decide which directories and files of a drive a search visits, with the rules of is_log_file,
+# archive_kind, is_log_archive and is_pruned_directory. The rotated log names repeat in every station folder,
+# so each file name and each directory is decided once per walk.
+class PathClassifier:
+    def __init__(self, station_name, is_non_standard, excludes):
+        self.station_lower = station_name.lower()
+        self.is_non_standard = is_non_standard
+        self.excludes = tuple(excludes)
+        self.files = {}
+
+    # Function to get the kind of a file to search by its name: 'log', 'compressed' (a compressed log), 'archive', or None
+    def file_kind(self, name):
+        try:
+            return self.files[name]
+        except KeyError:
+            pass
+        name_lower = name.lower()
+        kind = archive_kind(name_lower)
+        if kind is None:
+            kind = 'log' if is_log_file(name_lower, self.is_non_standard) else None
+        elif not is_log_archive(name_lower, self.is_non_standard):
+            kind = None
+        if kind is not None and any(word in name_lower for word in self.excludes):
+            kind = None
+        if len(self.files) < CLASSIFIER_MEMO_SIZE:
+            self.files[name] = kind
+        return kind
+
+    # Function to check whether a path has one of the exclusion words in it
+    def is_excluded(self, path):
+        path_lower = str(path).lower()
+        return any(word in path_lower for word in self.excludes)
+
+    # Function to get (pruned, station matches) of a directory from one lowered copy of its path, see is_pruned_directory.
+    # The walker keeps the station decision with the directory until it lists it.
+    def directory(self, dir_path):
+        dir_path_lower = dir_path.lower()
+        pruned = is_pruned_directory(dir_path_lower, self.excludes)
+        return pruned, self.station_lower in dir_path_lower
+
+# Function to walk a drive with os.scandir and yield (file path, stat result) of the log files to search.
+# Excluded subtrees are not descended into, and the stat result of the directory
+# listing is reused for the modification date filter. Files come in the same order as with os.walk.
+# With a manifest, unchanged directories are taken from the manifest instead of being listed again.
+# With include_archives, compressed logs and archives are yielded too, otherwise they are skipped.
+# With line_dates, plain logs modified after the end of the range are yielded too, for a reader that keeps only their lines in range.
+def walk_log_files(root_dir, station_name, is_non_standard, start_datetime, end_datetime, excludes, stop_event=None, stats=None, manifest=None,
+                   include_archives=False, line_dates=False):
+    if stats is None:
+        stats = WalkStats()
+    started = perf_counter()
+    classifier = PathClassifier(station_name, is_non_standard, excludes)
+    start_timestamp = start_datetime.timestamp()
+    end_timestamp = end_datetime.timestamp()
+
+    if classifier.is_excluded(root_dir):
+        stats.dirs_pruned += 1
+        stats.seconds += perf_counter() - started
+        return
+
+    stack = [(root_dir, classifier.directory(str(root_dir))[1])]
+    while stack:
+        # Stop walking when the drive was cancelled or timed out
+        if stop_event is not None and stop_event.is_set():
+            break
+
+        dir_path, station_matches = stack.pop()
+        candidates = []
+        try:
+            if manifest is not None:
+                subdirs, files = manifest.list_directory(dir_path, start_timestamp)
+            else:
+                subdirs, files = list_directory(dir_path)
+        except OSError as e:
+            stats.errors += 1
+            logger.warning("Error listing directory %s: %s", dir_path, e)
+            continue
+
+        stats.dirs_visited += 1
+        kept_subdirs = []
+        for subdir in subdirs:
+            pruned, subdir_station_matches = classifier.directory(subdir)
+            if pruned:
+                stats.dirs_pruned += 1
+                continue
+            kept_subdirs.append((subdir, subdir_station_matches))
+
+        stats.files_visited += len(files)
+        if not station_matches:
+            stats.files_skipped_station += len(files)
+            files = ()
+        for entry in files:
+            # Files with 'old', 'not_used', etc. in their names are no candidates
+            kind = classifier.file_kind(entry.name)
+            if kind is None or (kind != 'log' and not include_archives):
+                stats.files_skipped_name += 1
+                continue
+
+            # Check if the file modification time falls within the specified date range
+            try:
+                file_stat = entry.stat()
+            except OSError as e:
+                stats.errors += 1
+                logger.warning("Error reading file status %s: %s", entry.path, e)
+                continue
+            # An archive or a compressed log is written after the files in it, and a log can still be written to after the range,
+            # so only the start of the range applies to them. Their contents are checked when they are read.
+            open_ended = kind in ('archive', 'compressed') or (kind == 'log' and line_dates)
+            if start_timestamp <= file_stat.st_mtime and (open_ended or file_stat.st_mtime <= end_timestamp):
+                candidates.append((entry.path, file_stat))
+            else:
+                stats.files_skipped_date += 1
+
+        stats.files_matched += len(candidates)
+        stats.seconds += perf_counter() - started
+        yield from candidates
+        started = perf_counter()
+
+        # Visit the subdirectories in listing order, like os.walk
+        stack.extend(reversed(kept_subdirs))
+    stats.seconds += perf_counter() - started
@@ -0,0 +1,211 @@
+import csv
+import json
+import logging
+import os
+import threading
+from time import perf_counter
+
+from drive_walker import walk_log_files, WalkStats, UID_SEARCH_EXCLUDES
+from log_archives import iter_log_members
+from log_matching import TermMatcher, iter_matching_lines, parse_uid_attributes, uid_assy_positions, UID_IN_MARKER
+from result_writers import open_output
+from run_report import RunReport, save_run_report
+from search_engine import search_drives, search_period, drive_manifest, extract_station_name_from_logs, refresh_drive_index, report_settings
+from uid_index import UidIndex
+
+logger = logging.getLogger(__name__)
+
+# Directions of a genealogy trace: backward from a unit to the subassemblies it was built from,
+# forward from a subassembly to the units it was built into
+GENEALOGY_DIRECTIONS = ('backward', 'forward')
+
+# Header of the genealogy CSV output, one row per link of the traced trees
+GENEALOGY_CSV_HEADER = ['Root UID', 'Level', 'Parent UID', 'UID', 'UID Assy Position', 'Drive Name', 'Station Name']
+
+# Class for the uid_in → uid_assy links of all UNIT_RESULT lines of a search, held in memory in both directions,
+# so that the trees of any number of units are traced without reading the logs again.
+# Every link keeps the drive and station of the first line it was seen in.
+class GenealogyIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.assemblies = {}
+        self.used_in = {}
+        self.link_count = 0
+
+    # Function to add the links of a UNIT_RESULT record, uid_assy is {position: uid}
+    def add_record(self, uid_in, uid_assy, drive_name, station_name):
+        source = (drive_name, station_name)
+        with self.lock:
+            children = self.assemblies.setdefault(uid_in, {})
+            for position, uid in uid_assy.items():
+                if not uid or (position, uid) in children:
+                    continue
+                children[(position, uid)] = source
+                self.used_in.setdefault(uid, {})[(position, uid_in)] = source
+                self.link_count += 1
+
+    # Function to get the linked uids of a uid as sorted (position, uid, (drive, station)) tuples
+    def links(self, uid, direction):
+        adjacency = self.assemblies if direction == 'backward' else self.used_in
+        with self.lock:
+            linked = list(adjacency.get(uid, {}).items())
+        return sorted((position, linked_uid, source) for (position, linked_uid), source in linked)
+
+    # Function to trace the tree of a uid over every level, or max_depth levels, as nested dicts.
+    # A uid that already appears above it in its branch is not followed again.
+    def trace(self, uid, direction='backward', max_depth=None):
+        if direction not in GENEALOGY_DIRECTIONS:
+            raise ValueError(f"Unknown genealogy direction '{direction}', expected one of {', '.join(GENEALOGY_DIRECTIONS)}")
+        root = {'uid': uid, 'position': None, 'drive': None, 'station': None, 'children': []}
+        stack = [(root, 0, {uid})]
+        while stack:
+            node, depth, branch = stack.pop()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for position, linked_uid, (drive_name, station_name) in self.links(node['uid'], direction):
+                if linked_uid in branch:
+                    logger.warning("Genealogy of %s loops back to %s, the loop is not followed", uid, linked_uid)
+                    continue
+                child = {'uid': linked_uid, 'position': position, 'drive': drive_name, 'station': station_name, 'children': []}
+                node['children'].append(child)
+                stack.append((child, depth + 1, branch | {linked_uid}))
+        return root
+
+# Function to list the links of a traced tree depth first as (level, parent uid, node)
+def iter_tree_links(root):
+    stack = [(1, root['uid'], child) for child in reversed(root['children'])]
+    while stack:
+        level, parent_uid, node = stack.pop()
+        yield level, parent_uid, node
+        stack.extend((level + 1, node['uid'], child) for child in reversed(node['children']))
+
+# Function to write traced trees to the output, as JSON when the output path ends in .json and as CSV otherwise.
+# Returns the number of links written.
+def write_genealogy(output_path, trees, direction):
+    link_count = 0
+    if output_path.lower().endswith('.json'):
+        with open_output(output_path) as output_file:
+            json.dump({'direction': direction, 'trees': trees}, output_file, indent=2)
+        return sum(1 for tree in trees for _ in iter_tree_links(tree))
+
+    with open_output(output_path, newline='') as output_file:
+        csv_writer = csv.writer(output_file)
+        csv_writer.writerow(GENEALOGY_CSV_HEADER)
+        for tree in trees:
+            for level, parent_uid, node in iter_tree_links(tree):
+                csv_writer.writerow([tree['uid'], level, parent_uid, node['uid'], node['position'], node['drive'], node['station']])
+                link_count += 1
+    return link_count
+
+# Function to add the UNIT_RESULT links of a log file to the genealogy, compressed logs and archives are read like in process_file_uids.
+# marker_matcher is a TermMatcher for UID_IN_MARKER with the encoding and errors policy of the logs.
+# file_stat is the status of the file from the walk.
+# Returns (number of UNIT_RESULT records read, bytes read), the bytes of archives are the decompressed bytes read from them.
+def collect_file_links(file_path, drive_name, genealogy, marker_matcher, is_non_standard, date_range=None, file_stat=None):
+    station_name = extract_station_name_from_logs(file_path)
+    record_count = 0
+    bytes_read = 0
+    try:
+        for member_path, member_mtime, file in iter_log_members(file_path, is_non_standard, date_range, None, file_stat):
+            for line, _ in iter_matching_lines(file, marker_matcher):
+                fields = parse_uid_attributes(line)
+                uid_in = fields.get('in')
+                if uid_in:
+                    genealogy.add_record(uid_in, uid_assy_positions(fields), drive_name, station_name)
+                    record_count += 1
+            bytes_read += file.tell()
+    except Exception as e:
+        logger.error("Error processing file %s: %s", file_path, e)
+    return record_count, bytes_read
+
+# Function to traverse the log files of a drive within a date range and add their links to the genealogy.
+# Every station is read, the subassemblies of a unit are built at other stations than the unit itself.
+# With a report (the DriveReport of the drive) the walk and the files read are counted in it.
+def traverse_directory_genealogy(root_dir, drive_name, genealogy, marker_matcher, start_date, end_date, is_non_standard, stop_event=None, manifest=None,
+                                 progress=None, report=None):
+    stats = WalkStats()
+    try:
+        logger.info("Processing drive: %s at path: %s", drive_name, root_dir)
+        start_datetime, end_datetime = search_period(start_date, end_date)
+        date_range = (start_datetime.timestamp(), end_datetime.timestamp())
+
+        for file_path, file_stat in walk_log_files(root_dir, '', is_non_standard, start_datetime, end_datetime, UID_SEARCH_EXCLUDES,
+                                                   stop_event, stats, manifest, include_archives=True, line_dates=True):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if progress is not None:
+                progress.file_found()
+            started = perf_counter()
+            record_count, bytes_read = collect_file_links(file_path, drive_name, genealogy, marker_matcher, is_non_standard, date_range, file_stat)
+            if progress is not None:
+                progress.file_done(bytes_read)
+            if report is not None:
+                report.file_read(extract_station_name_from_logs(file_path), bytes_read, record_count, perf_counter() - started)
+
+        if stop_event is not None and stop_event.is_set():
+            logger.info("Stopped traversing drive: %s", drive_name)
+        logger.info("Drive %s: %s", drive_name, stats)
+        if manifest is not None:
+            manifest.save()
+    except Exception as e:
+        logger.error("Error traversing directory %s: %s", root_dir, e)
+    if report is not None:
+        report.walk_done(stats, manifest)
+
+# Function to trace the genealogy of the searched uids and write the trees to the genealogy output.
+# The logs are read once for all uids and levels, or with use_index the links come from the UID index.
+# It does not touch any widget, so it can run on a worker thread of the window or from the command line.
+# A run report is written like for run_line_search.
+def run_genealogy_search(search_terms, start_date, end_date, drives, is_non_standard, output_path, config,
+                         direction='backward', max_depth=None, use_index=False, full_rescan=False, progress=None, cancel_event=None,
+                         report_path=None):
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    report = RunReport('genealogy', report_settings(config, search_terms, start_date, end_date, '', drives, is_non_standard, direction=direction,
+                                                    max_depth=max_depth, use_index=use_index, full_rescan=full_rescan), config['profile_searches'])
+
+    summary = {'output_path': output_path, 'result_count': 0, 'cancelled': False,
+               'not_found': [], 'report_empty': True, 'error': None}
+    genealogy = GenealogyIndex()
+    if use_index:
+        search_drives(drives, lambda drive_path, drive_name, drive_found_terms, stop_event: refresh_drive_index(
+            config, drive_path, drive_name, None, start_date, end_date, '', is_non_standard, 0, stop_event,
+            drive_manifest(config, drive_name, drive_path, full_rescan), progress, report.drive(drive_name)), config, progress, cancel_event, report)
+        started = perf_counter()
+        with UidIndex(config['uid_index_path']) as uid_index:
+            for drive_name, station_name, uid_in, uid_assy in uid_index.iter_records(
+                    *search_period(start_date, end_date), [drive_name for drive_name, drive_path in drives], is_non_standard):
+                genealogy.add_record(uid_in, uid_assy, drive_name, station_name)
+        report.add_stage('index_query', perf_counter() - started)
+    else:
+        marker_matcher = TermMatcher([UID_IN_MARKER], config['log_encoding'], config['log_decode_errors'])
+        search_drives(
+            drives,
+            lambda drive_path, drive_name, drive_found_terms, stop_event: traverse_directory_genealogy(
+                drive_path, drive_name, genealogy, marker_matcher, start_date, end_date, is_non_standard, stop_event,
+                drive_manifest(config, drive_name, drive_path, full_rescan), progress, report.drive(drive_name)),
+            config, progress, cancel_event, report)
+    logger.info("Collected %d genealogy links", genealogy.link_count)
+
+    # Each uid is traced once, in the order it was searched for
+    started = perf_counter()
+    trees = [genealogy.trace(uid, direction, max_depth) for uid in dict.fromkeys(term.strip() for term in search_terms) if uid]
+    report.add_stage('trace', perf_counter() - started)
+    summary['not_found'] = [tree['uid'] for tree in trees if not tree['children']]
+    if progress is not None:
+        for tree in trees:
+            progress.add_results([tree['uid']] + ['  ' * level + node['uid'] for level, parent_uid, node in iter_tree_links(tree)])
+    started = perf_counter()
+    try:
+        summary['result_count'] = write_genealogy(output_path, trees, direction)
+    except Exception as e:
+        summary['error'] = f"Could not write to file: {e}"
+    report.add_stage('output', perf_counter() - started)
+    summary['cancelled'] = cancel_event.is_set()
+    report.finish(summary)
+    summary['report_path'] = save_run_report(report, config, report_path)
+    return summary
+
+# Function to get the genealogy output path of the configuration with the extension of an output format, csv or json
+def genealogy_output_path(config, output_format='csv'):
+    return os.path.splitext(config['output_path_genealogy'])[0] + '.' + output_format
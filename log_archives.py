@@ -0,0 +1,102 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tarfile
+import zipfile
+from datetime import datetime
+
+from drive_walker import archive_kind, is_log_file
+from log_matching import open_log_raw, stream_log_binary, open_log_range_binary
+from log_timestamps import time_byte_range
+
+# Functions to open a single compressed file for reading, by suffix
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+# Function to narrow the byte range to read of a plain log file to the byte range of its lines in the date range
+def narrow_byte_range(byte_range, time_range):
+    if time_range is None:
+        return byte_range
+    if byte_range is None:
+        return time_range
+    start = max(byte_range[0], time_range[0])
+    return start, max(start, min(byte_range[1], time_range[1]))
+
+# Function to check the name and date of a file in an archive.
+# date_range is (start timestamp, end timestamp), or None to take every log file.
+def is_wanted_member(member_name, member_mtime, is_non_standard, date_range):
+    if not is_log_file(os.path.basename(member_name).lower(), is_non_standard):
+        return False
+    return date_range is None or date_range[0] <= member_mtime <= date_range[1]
+
+# Function to get the modification time of the log in a compressed file, from the gzip header, or None when it has none.
+# gzip keeps the time of the file it compressed, bz2 and xz keep no time.
+def compressed_member_mtime(file):
+    if not isinstance(file, gzip.GzipFile):
+        return None
+    # The header is read with the first bytes
+    file.peek(1)
+    return file.mtime or None
+
+# Function to list the log files of a zip archive as (member path, mtime, binary file)
+def iter_zip_members(file_path, is_non_standard, date_range):
+    with zipfile.ZipFile(file_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            member_mtime = datetime(*info.date_time).timestamp()
+            if not is_wanted_member(info.filename, member_mtime, is_non_standard, date_range):
+                continue
+            with archive.open(info) as file:
+                yield os.path.join(file_path, *info.filename.split('/')), member_mtime, file
+
+# Function to list the log files of a tar archive as (member path, mtime, binary file) in archive order
+def iter_tar_members(file_path, is_non_standard, date_range):
+    with tarfile.open(file_path, 'r:*') as archive:
+        for info in archive:
+            if not info.isfile() or not is_wanted_member(info.name, info.mtime, is_non_standard, date_range):
+                continue
+            with archive.extractfile(info) as file:
+                yield os.path.join(file_path, *info.name.split('/')), info.mtime, file
+
+# Function to stream the log files stored in a file as (member path, mtime, binary file), decompressing on the fly.
+# A plain log file is the only member of itself and comes with no member path and mtime. A compressed log is one
+# member, dated by its gzip header or else by the compressed file. The files in an archive must be logs by name, and
+# with a date_range they and compressed logs must be modified within it. Of a plain log only the lines timestamped
+# within the date_range are read, and with a byte_range (start, end) only that part of it.
+# file_stat is the status of the file from the walk.
+# The files are streamed as raw bytes, the matcher decodes the lines it keeps.
+def iter_log_members(file_path, is_non_standard, date_range=None, byte_range=None, file_stat=None):
+    name_lower = os.path.basename(file_path).lower()
+    kind = archive_kind(name_lower)
+    if kind is None:
+        # The file is opened once. The binary search for the lines in the date range reads a few lines at each probe,
+        # it gets a small buffer of its own so a probe does not read a whole block of the streaming buffer.
+        with open_log_raw(file_path) as raw_file:
+            if date_range is not None:
+                probe_file = io.BufferedReader(raw_file)
+                byte_range = narrow_byte_range(byte_range, time_byte_range(probe_file, *date_range, file_stat))
+                probe_file.detach()
+            if byte_range is None:
+                file = stream_log_binary(raw_file)
+            else:
+                file = open_log_range_binary(raw_file, *byte_range)
+            with file:
+                yield None, None, file
+    elif kind == 'compressed':
+        opener = COMPRESSED_OPENERS[os.path.splitext(name_lower)[1]]
+        with opener(file_path, 'rb') as file:
+            member_mtime = compressed_member_mtime(file)
+            if date_range is not None:
+                # A log is often compressed after its period, so the walker takes compressed files modified after the range
+                modified = member_mtime
+                if modified is None:
+                    modified = (file_stat or os.stat(file_path)).st_mtime
+                if not date_range[0] <= modified <= date_range[1]:
+                    return
+            yield file_path, member_mtime, file
+    elif name_lower.endswith('.zip'):
+        yield from iter_zip_members(file_path, is_non_standard, date_range)
+    else:
+        yield from iter_tar_members(file_path, is_non_standard, date_range)
@@ -0,0 +1,309 @@
+import codecs
+import io
+import locale
+import re
+from collections import deque
+from functools import lru_cache
+
+# Size of the read buffer used when streaming log files
+READ_BUFFER_SIZE = 1024 * 1024
+
+# Pattern for the uid_in="..." and uid_assy_N="..." attributes written on the unit result lines.
+# Anchoring on the literal "uid_" prefix lets the regex engine skip quickly over all other attributes.
+UID_ATTRIBUTE_PATTERN = re.compile(r'uid_(in|assy_\d+)="([^"]*)"')
+
+# Ways to handle bytes of a log line that are not valid in the log encoding, as in bytes.decode
+DECODE_ERROR_POLICIES = ('replace', 'backslashreplace', 'ignore', 'strict')
+
+# Class to find every search term contained in a line with a single scan of the line.
+# An Aho-Corasick automaton reports which terms hit, and a trie-shaped regex built from
+# the same terms is used as a fast prefilter so that lines without any hit never leave C code.
+# The same prefilter over the encoded terms finds the lines worth decoding in the raw bytes of a log,
+# they are decoded with the encoding (the platform default when None) and errors policy of the matcher.
+class TermMatcher:
+    def __init__(self, search_terms, encoding=None, errors='replace'):
+        # Keep the terms in the order they were entered, without duplicates
+        self.terms = list(dict.fromkeys(search_terms))
+        self._order = {term: index for index, term in enumerate(self.terms)}
+
+        # An empty term (e.g. from an empty search field) is contained in every line
+        self.match_all = '' in self._order
+
+        if errors not in DECODE_ERROR_POLICIES:
+            raise ValueError(f"Unknown decode error policy '{errors}', expected one of {', '.join(DECODE_ERROR_POLICIES)}")
+        self.encoding = codecs.lookup(encoding or locale.getpreferredencoding(False)).name
+        self.errors = errors
+
+        self._build_automaton()
+        self._prefilter = self._build_prefilter(self.terms)
+        self.byte_prefilter = self._build_byte_prefilter()
+
+    # Function to build the goto, failure and output tables of the automaton
+    def _build_automaton(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for term in self.terms:
+            if not term:
+                continue
+            state = 0
+            for char in term:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(term)
+
+        # Breadth-first pass to link every state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    # Function to build one regex that matches if any of the terms is contained in a line
+    def _build_prefilter(self, terms):
+        trie = {}
+        for term in terms:
+            if not term:
+                continue
+            node = trie
+            for char in term:
+                # A shorter term already ends here, longer ones cannot add new hits
+                if node.get('') is True:
+                    break
+                node = node.setdefault(char, {})
+            else:
+                node.clear()
+                node[''] = True
+
+        if not trie:
+            return None
+        return re.compile(_trie_to_pattern(trie))
+
+    # Function to build the prefilter for raw lines in the log encoding. The encoded terms are spelled as latin-1
+    # characters, one per byte, so the trie pattern of them turns back into the bytes pattern by encoding it as latin-1.
+    def _build_byte_prefilter(self):
+        encoded_terms = []
+        for term in self.terms:
+            try:
+                encoded_terms.append(term.encode(self.encoding).decode('latin-1'))
+            except UnicodeEncodeError:
+                # A term the log encoding cannot write cannot be in the logs
+                pass
+        prefilter = self._build_prefilter(encoded_terms)
+        if prefilter is None:
+            return None
+        return re.compile(prefilter.pattern.encode('latin-1'))
+
+    # Function to decode a raw line with the encoding and errors policy of the matcher
+    def decode(self, line):
+        return line.decode(self.encoding, self.errors)
+
+    # Function to return the search terms contained in a line, in the order they were entered
+    def find_terms(self, line):
+        if self._prefilter is None or not self._prefilter.search(line):
+            return [''] if self.match_all else []
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = set()
+        state = 0
+        for char in line:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+        if self.match_all:
+            found.add('')
+        return sorted(found, key=self._order.get)
+
+# Function to turn a trie of characters into a regex pattern without backtracking between siblings
+def _trie_to_pattern(node):
+    if node.get('') is True:
+        return ''
+    alternatives = [re.escape(char) + _trie_to_pattern(child) for char, child in sorted(node.items())]
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+# Class to read the bytes from start to end of an open binary file, a reader over it sees the end of the range as the end of the file
+class ByteRangeReader(io.RawIOBase):
+    def __init__(self, file, start, end):
+        self.file = file
+        self.file.seek(start)
+        self.start = start
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    # Function to get the number of bytes of the range read so far
+    def tell(self):
+        return self.file.tell() - self.start
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        count = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= count
+        return count
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+# Function to open a log file for streaming its raw bytes with a large read buffer
+def open_log_binary(file_path):
+    return open(file_path, 'rb', buffering=READ_BUFFER_SIZE)
+
+# Function to open a log file without a buffer, to look for the part of it to read before streaming that part
+def open_log_raw(file_path):
+    return open(file_path, 'rb', buffering=0)
+
+# Function to stream the raw bytes of a log file opened with open_log_raw from its start, with a large read buffer
+def stream_log_binary(raw_file):
+    raw_file.seek(0)
+    return io.BufferedReader(raw_file, READ_BUFFER_SIZE)
+
+# Function to stream the bytes from start to end of a log file opened with open_log_raw, with a large read buffer.
+# start and end must be at line boundaries.
+def open_log_range_binary(file, start, end):
+    return io.BufferedReader(ByteRangeReader(file, start, end), READ_BUFFER_SIZE)
+
+# Function to stream the lines of a binary log file that may contain a search term, as (line, next line).
+# The file is read in large blocks and the byte prefilter of the matcher finds the candidate lines in them,
+# so only those lines and, with with_next, the line that follows each of them are decoded. The next line
+# is None without with_next and for the last line. A match on every line reads the file line by line.
+def iter_matching_lines(file, matcher, with_next=False):
+    if matcher.match_all:
+        lines = (matcher.decode(line) for line in file)
+        yield from iter_lines_with_next(lines) if with_next else ((line, None) for line in lines)
+        return
+    prefilter = matcher.byte_prefilter
+    if prefilter is None:
+        return
+
+    carry = b''
+    waiting = None  # A matching line at the end of a block, its next line starts the next block
+    while True:
+        block = file.read(READ_BUFFER_SIZE)
+        if not block:
+            break
+        data = carry + block if carry else block
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            carry = data
+            continue
+        carry = data[end:]
+        if waiting is not None:
+            yield matcher.decode(waiting), matcher.decode(data[:data.find(b'\n') + 1])
+            waiting = None
+
+        position = 0
+        while True:
+            match = prefilter.search(data, position, end)
+            if match is None:
+                break
+            line_start = data.rfind(b'\n', 0, match.start()) + 1
+            position = data.find(b'\n', match.start()) + 1
+            line = data[line_start:position]
+            if not with_next:
+                yield matcher.decode(line), None
+            elif position < end:
+                yield matcher.decode(line), matcher.decode(data[position:data.find(b'\n', position) + 1])
+            else:
+                waiting = line
+
+    if waiting is not None:
+        yield matcher.decode(waiting), matcher.decode(carry) if carry else None
+    if carry and prefilter.search(carry):
+        yield matcher.decode(carry), None
+
+# Function to stream the lines of a binary log file that may contain a search term as (byte offset of the line, line),
+# with the block scan of iter_matching_lines.
+def iter_matching_line_offsets(file, matcher):
+    offset = 0  # Offset of the start of data in the file
+    if matcher.match_all:
+        for line in file:
+            yield offset, matcher.decode(line)
+            offset += len(line)
+        return
+    prefilter = matcher.byte_prefilter
+    if prefilter is None:
+        return
+
+    carry = b''
+    while True:
+        block = file.read(READ_BUFFER_SIZE)
+        if not block:
+            break
+        data = carry + block if carry else block
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            carry = data
+            continue
+        position = 0
+        while True:
+            match = prefilter.search(data, position, end)
+            if match is None:
+                break
+            line_start = data.rfind(b'\n', 0, match.start()) + 1
+            position = data.find(b'\n', match.start()) + 1
+            yield offset + line_start, matcher.decode(data[line_start:position])
+        carry = data[end:]
+        offset += end
+
+    if carry and prefilter.search(carry):
+        yield offset, matcher.decode(carry)
+
+# Function to stream the lines of a file together with the line that follows each of them.
+# Only one line is buffered, the last line of the file is paired with None.
+def iter_lines_with_next(file):
+    previous = None
+    for line in file:
+        if previous is not None:
+            yield previous, line
+        previous = line
+    if previous is not None:
+        yield previous, None
+
+# Text that starts the UID attributes of a UNIT_RESULT line, only the lines with it are decoded
+UID_IN_MARKER = 'uid_in="'
+
+# Function to parse all uid_in and uid_assy_N attributes of a line in one pass into {'in': ..., 'assy_N': ...}.
+# Like a separate re.search per attribute, the first non-empty value of an attribute wins.
+def parse_uid_attributes(line):
+    fields = {}
+    for key, value in UID_ATTRIBUTE_PATTERN.findall(line):
+        if value and key not in fields:
+            fields[key] = value
+    return fields
+
+# Function to get the parsed attribute keys of uid_assy_1 to uid_assy_n
+@lru_cache(maxsize=None)
+def uid_assy_keys(n):
+    return tuple(f'assy_{j}' for j in range(1, n + 1))
+
+# Function to extract uid_in and uid_assy_1 to uid_assy_n from a line, missing assy values are ''
+def extract_uid_fields(line, n):
+    fields = parse_uid_attributes(line)
+    return fields.get('in'), [fields.get(key, '') for key in uid_assy_keys(n)]
+
+# Function to get all uid_assy values of parsed attributes as {position: uid}, whatever their count
+def uid_assy_positions(fields):
+    return {int(key[5:]): value for key, value in fields.items() if key != 'in'}
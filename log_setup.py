@@ -0,0 +1,33 @@
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Function to route all logging through a queue to a size-rotated log file and the console.
+# The search threads only put records on the queue, formatting and writing happen on the listener thread.
+def setup_logging(log_path='UnitID_Log.txt', level='INFO', max_bytes=5 * 1024 * 1024, backup_count=3, console=True):
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+    handlers = []
+    file_handler = RotatingFileHandler(log_path, mode='a', maxBytes=max_bytes, backupCount=backup_count)
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
+
+    if console:
+        # Bind the real stderr now, it may be redirected to the logger afterwards
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    return listener
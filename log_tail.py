@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from drive_walker import archive_kind
+
+logger = logging.getLogger(__name__)
+
+# Number of bytes at the start of a file that identify it, a rotated file starts with other bytes
+HEAD_BYTES = 1024
+
+# A file modified within this many seconds may still be written to, so a line at its end may not be complete yet
+GROWING_SECONDS = 10 * 60
+
+# Size of the blocks read backwards from the end of a file to find the last complete line
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Function to get the key of a search, the saved offsets are only valid for the same search
+def search_key(*search_settings):
+    return hashlib.sha1(json.dumps(search_settings, default=str).encode('utf-8')).hexdigest()
+
+# Function to get the path of the offsets file of an output file in the tail state directory
+def tail_state_path(state_dir, output_path):
+    os.makedirs(state_dir, exist_ok=True)
+    file_name = hashlib.sha1(os.path.abspath(output_path).encode('utf-8')).hexdigest()[:16] + '.json'
+    return os.path.join(state_dir, file_name)
+
+# Function to find the position after the last line break between start and end of a binary file, or start if there is none
+def last_line_end(file, start, end):
+    position = end
+    while position > start:
+        block_start = max(start, position - TAIL_BLOCK_SIZE)
+        file.seek(block_start)
+        block = file.read(position - block_start)
+        index = block.rfind(b'\n')
+        if index >= 0:
+            return block_start + index + 1
+        position = block_start
+    return start
+
+# Class for the read offsets of the log files of a repeated search, so that the next run only reads what was appended.
+# A file is recognised by its inode and its first bytes, the offset starts over when a file was rotated or truncated.
+# Of a file that is still growing only complete lines are read, and in line searches a UNIT_RESULT line at its end
+# waits for the line that follows it.
+class TailState:
+    def __init__(self, state_path, key):
+        self.state_path = state_path
+        self.key = key
+        self.lock = threading.Lock()
+        self.files = {}
+        self.found_terms = set()
+        self.is_new = True
+
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r') as state_file:
+                    data = json.load(state_file)
+                if data.get('key') == key:
+                    self.files = data.get('files', {})
+                    self.found_terms = set(data.get('found_terms', []))
+                    self.is_new = False
+            except (OSError, ValueError) as e:
+                logger.warning("Error reading tail state %s: %s", state_path, e)
+
+        self.paths_by_inode = {(record['dev'], record['ino']): path for path, record in self.files.items() if record.get('ino')}
+
+    # Function to forget the offsets and found terms, so that the next run reads every file from the start
+    def reset(self):
+        with self.lock:
+            self.files = {}
+            self.found_terms = set()
+            self.paths_by_inode = {}
+            self.is_new = True
+
+    # Function to decide which part of a file to read. Returns None when there is nothing new, otherwise
+    # (byte range or None to read the whole file, record to pass to update once the part was read)
+    def plan_read(self, file_path, file_stat, hold_unit_result=False):
+        try:
+            return self._plan_read(file_path, file_stat, hold_unit_result)
+        except OSError as e:
+            logger.warning("Error reading the end of file %s: %s", file_path, e)
+            return None
+
+    def _plan_read(self, file_path, file_stat, hold_unit_result):
+        with self.lock:
+            previous = self.files.get(file_path)
+        if previous is not None and previous['size'] == file_stat.st_size and previous['mtime'] == file_stat.st_mtime:
+            return None
+
+        # Compressed logs and archives are not appended to, they are read again as a whole when they change
+        if archive_kind(os.path.basename(file_path).lower()):
+            return None, {'size': file_stat.st_size, 'mtime': file_stat.st_mtime}
+
+        with open(file_path, 'rb') as file:
+            current_stat = os.fstat(file.fileno())
+            head = file.read(HEAD_BYTES)
+
+            # A file that moved here by rotation keeps its inode and continues from its old offset
+            if previous is None and current_stat.st_ino:
+                with self.lock:
+                    moved_from = self.paths_by_inode.get((current_stat.st_dev, current_stat.st_ino))
+                    previous = self.files.get(moved_from) if moved_from is not None else None
+
+            start = 0
+            if previous is not None:
+                same_inode = not current_stat.st_ino or not previous['ino'] or (
+                    (previous['dev'], previous['ino']) == (current_stat.st_dev, current_stat.st_ino))
+                same_head = hashlib.sha1(head[:previous['head_len']]).hexdigest() == previous['head']
+                if not same_inode or not same_head:
+                    logger.info("Log file was rotated, reading it from the start: %s", file_path)
+                elif current_stat.st_size < previous['offset']:
+                    logger.info("Log file was truncated, reading it from the start: %s", file_path)
+                else:
+                    start = previous['offset']
+
+            if time.time() - current_stat.st_mtime > GROWING_SECONDS:
+                end = current_stat.st_size
+            else:
+                end = last_line_end(file, start, current_stat.st_size)
+                # The whole trailing run of UNIT_RESULT lines waits, each of them needs the line that follows it
+                while hold_unit_result and end > start:
+                    line_start = last_line_end(file, start, end - 1)
+                    file.seek(line_start)
+                    if b'UNIT_RESULT' not in file.read(end - line_start):
+                        break
+                    end = line_start
+
+        if end <= start:
+            return None
+        record = {
+            'dev': current_stat.st_dev,
+            'ino': current_stat.st_ino,
+            'size': current_stat.st_size,
+            'mtime': current_stat.st_mtime,
+            'head': hashlib.sha1(head).hexdigest(),
+            'head_len': len(head),
+            'offset': end,
+        }
+        return (start, end), record
+
+    # Function to record how far a file was read
+    def update(self, file_path, record):
+        with self.lock:
+            self.files[file_path] = record
+            if record.get('ino'):
+                self.paths_by_inode[(record['dev'], record['ino'])] = file_path
+
+    # Function to write the offsets and the terms found so far back to disk
+    def save(self):
+        temp_path = self.state_path + '.tmp'
+        with self.lock:
+            data = {'key': self.key, 'files': self.files, 'found_terms': sorted(self.found_terms)}
+        try:
+            with open(temp_path, 'w') as state_file:
+                json.dump(data, state_file)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            logger.warning("Error writing tail state %s: %s", self.state_path, e)
@@ -0,0 +1,112 @@
+import os
+import re
+from datetime import datetime
+
+from log_tail import last_line_end
+
+# Pattern for the timestamp at the start of a log line, e.g. "2024-03-01 14:05:09,123" or "[2024/03/01T14:05:09]"
+LINE_TIMESTAMP_PATTERN = re.compile(rb'\s*\[?(\d{4})[-/.](\d{2})[-/.](\d{2})[ T](\d{2}):(\d{2}):(\d{2})')
+
+# The binary search stops when the part of the file left is smaller than this and reads it line by line
+SEARCH_SPAN = 64 * 1024
+
+# Number of bytes read at most to find the next line with a timestamp
+PROBE_BYTES = 64 * 1024
+
+# Function to get the timestamp at the start of a line of bytes, or None when it has none
+def line_timestamp(line):
+    match = LINE_TIMESTAMP_PATTERN.match(line)
+    if match is None:
+        return None
+    try:
+        return datetime(*map(int, match.groups())).timestamp()
+    except ValueError:
+        return None
+
+# Function to find the first line with a timestamp that starts at or after offset, as (line start, timestamp), or None
+def next_timestamped_line(file, offset, size):
+    file.seek(max(offset - 1, 0))
+    if offset > 0:
+        # Skip the rest of the line offset is in, unless offset is the start of a line
+        file.readline()
+    position = file.tell()
+    while position < size and position < offset + PROBE_BYTES:
+        line = file.readline()
+        if not line:
+            break
+        timestamp = line_timestamp(line)
+        if timestamp is not None:
+            return position, timestamp
+        position += len(line)
+    return None
+
+# Function to find the timestamp of the last line that has one
+def last_timestamp(file, size):
+    end = size
+    while end > 0 and size - end < PROBE_BYTES:
+        line_start = last_line_end(file, max(size - PROBE_BYTES, 0), end - 1)
+        file.seek(line_start)
+        timestamp = line_timestamp(file.read(end - line_start))
+        if timestamp is not None:
+            return timestamp
+        end = line_start
+    return None
+
+# Function to binary search a time-ordered file for the start of the first line with a timestamp at or after target,
+# or after target when strict. Lines without a timestamp belong to the line before them. Returns size when there is none.
+def seek_time(file, size, target, strict):
+    lo, hi = 0, size
+    while hi - lo > SEARCH_SPAN:
+        mid = (lo + hi) // 2
+        found = next_timestamped_line(file, mid, hi)
+        if found is None:
+            hi = mid
+            continue
+        position, timestamp = found
+        if timestamp > target or (not strict and timestamp == target):
+            hi = mid
+        else:
+            lo = position + 1
+
+    # lo is the start of a line or just after one that is not in range, read on from the next line start
+    file.seek(max(lo - 1, 0))
+    if lo > 0:
+        file.readline()
+    position = file.tell()
+    for line in iter(file.readline, b''):
+        timestamp = line_timestamp(line)
+        if timestamp is not None and (timestamp > target or (not strict and timestamp == target)):
+            return position
+        position += len(line)
+    return size
+
+# Function to find the bytes of a plain log file with the lines timestamped from start_timestamp to end_timestamp.
+# Log lines are written in time order, so the first and last line in range are found by binary search on byte offsets.
+# Every file is narrowed the same way whatever its size, the search of a small file ends in reading its lines one by one.
+# Returns (start, end), or None to read the whole file when it has no timestamps or they are not in order.
+# Files like that which were modified after the range are not read at all.
+# A UNIT_RESULT line at the end of the range keeps the line that follows it.
+# file is the log opened in binary mode with a small buffer, each probe reads a buffer of it.
+# file_stat is its status from the walk, without it the file is asked for it.
+def time_byte_range(file, start_timestamp, end_timestamp, file_stat=None):
+    if file_stat is None:
+        file_stat = os.fstat(file.fileno())
+    size = file_stat.st_size
+    modified_in_range = file_stat.st_mtime <= end_timestamp
+
+    first = next_timestamped_line(file, 0, size)
+    last = last_timestamp(file, size) if first is not None else None
+    if first is None or last is None or last < first[1]:
+        return None if modified_in_range else (0, 0)
+    first_timestamp = first[1]
+    if first_timestamp > end_timestamp or last < start_timestamp:
+        return 0, 0
+
+    start = 0 if first_timestamp >= start_timestamp else seek_time(file, size, start_timestamp, False)
+    end = size if last <= end_timestamp else seek_time(file, size, end_timestamp, True)
+    if start < end < size:
+        line_start = last_line_end(file, start, end - 1)
+        file.seek(line_start)
+        if b'UNIT_RESULT' in file.read(end - line_start):
+            end += len(file.readline())
+    return start, max(start, end)
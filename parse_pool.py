@@ -0,0 +1,195 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from drive_walker import archive_kind
+from log_archives import narrow_byte_range
+from log_matching import TermMatcher
+from log_tail import last_line_end
+from log_timestamps import time_byte_range
+
+logger = logging.getLogger(__name__)
+
+# Plain log files larger than this are split into chunks of about this size, each parsed by its own process
+PARSE_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Smaller files are handed to the processes in batches of about this many bytes, or this many files
+PARSE_BATCH_BYTES = 4 * 1024 * 1024
+PARSE_BATCH_FILES = 64
+
+# Number of tasks a drive keeps queued per process, a drive thread waits for its oldest task beyond that
+TASKS_PER_PROCESS = 2
+
+# Term matcher of a parsing process, built once when the process starts
+worker_matcher = None
+
+# Function to build the term matcher of a parsing process
+def init_worker(search_terms, encoding, errors):
+    global worker_matcher
+    worker_matcher = TermMatcher(search_terms, encoding, errors)
+
+# Class to collect the result batches of a parsing process, they are sent back and written by the drive thread
+class CollectingWriter:
+    def __init__(self):
+        self.batches = []
+
+    # Function to keep a batch of results with the modification time of the file they come from
+    def write_results(self, results, seen_time=None):
+        if results:
+            self.batches.append((results, seen_time))
+
+# Function to parse a task of pieces in a parsing process, it returns (result batches, found terms, piece counts).
+# A piece is (file path, file status from the walk, date range, byte range), mode is 'lines' or 'uids'.
+# The piece counts are (number of results, bytes read, seconds) for each piece, for the run report.
+def parse_pieces(mode, pieces, drive_name, is_non_standard, n):
+    # search_engine imports this module, it is only needed once the process runs a task
+    from search_engine import process_file, process_file_uids
+
+    writer = CollectingWriter()
+    found_terms = set()
+    piece_counts = []
+    for file_path, file_stat, date_range, byte_range in pieces:
+        started = perf_counter()
+        if mode == 'lines':
+            result_count, bytes_read = process_file(file_path, drive_name, worker_matcher, found_terms, writer, is_non_standard, date_range,
+                                                    byte_range, file_stat)
+        else:
+            result_count, bytes_read = process_file_uids(file_path, drive_name, worker_matcher, found_terms, writer, is_non_standard, n,
+                                                         file_stat.st_mtime, date_range, byte_range, file_stat)
+        piece_counts.append((result_count, bytes_read, perf_counter() - started))
+    return writer.batches, found_terms, piece_counts
+
+# Function to split the bytes start to end of a plain log file into chunks of about chunk_size that end at a line break.
+# A chunk never ends after a UNIT_RESULT line, the line that follows it belongs to the result.
+# That line can be a UNIT_RESULT line itself, so the chunk grows until its last line is none.
+# file is the log opened in binary mode.
+def chunk_ranges(file, start, end, chunk_size=PARSE_CHUNK_BYTES):
+    ranges = []
+    position = start
+    while end - position > chunk_size:
+        file.seek(position + chunk_size)
+        line_end = position + chunk_size + len(file.readline())
+        line_start = last_line_end(file, position, position + chunk_size)
+        file.seek(line_start)
+        last_line = file.read(line_end - line_start)
+        while b'UNIT_RESULT' in last_line and line_end < end:
+            last_line = file.readline()
+            line_end += len(last_line)
+        if line_end >= end:
+            break
+        ranges.append((position, line_end))
+        position = line_end
+    ranges.append((position, end))
+    return ranges
+
+# Class for the processes that parse log files, shared by the drive threads of a search.
+# Large plain log files are parsed in chunks and small files in batches, so the work spreads over every core.
+# The processes are started with spawn on every platform, the drive threads must not be copied into them.
+class ParsePool:
+    def __init__(self, processes, matcher, n=0):
+        self.processes = processes
+        self.n = n
+        self.executor = ProcessPoolExecutor(processes, multiprocessing.get_context('spawn'), init_worker,
+                                            (matcher.terms, matcher.encoding, matcher.errors))
+        logger.info("Parsing log files in %d processes", processes)
+
+    # Function to start the parsing of the files of a drive, the results are written in the order the files were added
+    def pipeline(self, mode, drive_name, writer, found_terms, is_non_standard):
+        return ParsePipeline(self, mode, drive_name, writer, found_terms, is_non_standard)
+
+    # Function to stop the processes once the search is done
+    def shutdown(self, cancel=False):
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
+
+# Class to parse the log files of one drive in the processes of a ParsePool.
+# The drive thread adds the files as it finds them and writes the results of the oldest tasks once they are done,
+# so the output has the same order as without processes.
+class ParsePipeline:
+    def __init__(self, pool, mode, drive_name, writer, found_terms, is_non_standard):
+        self.pool = pool
+        self.mode = mode
+        self.drive_name = drive_name
+        self.writer = writer
+        self.found_terms = found_terms
+        self.is_non_standard = is_non_standard
+        self.max_pending = pool.processes * TASKS_PER_PROCESS
+        self.pending = deque()
+        self.batch = []
+        self.batch_bytes = 0
+        self.batch_callbacks = []
+        self.result_count = 0
+        # Results, bytes read and seconds of the chunks of a file until its last chunk is written
+        self.file_counts = [0, 0, 0.0]
+
+    # Function to add a file to parse, file_done is called with the number of its results, the bytes read and the seconds it took
+    # once its results are written. date_range (start, end timestamps) and byte_range are the ones process_file takes.
+    def add(self, file_path, file_stat, date_range, byte_range, file_done):
+        if archive_kind(os.path.basename(file_path).lower()) is None and file_stat.st_size > PARSE_CHUNK_BYTES:
+            try:
+                # The lines in the date range and the chunk boundaries are found on one handle, with the status from the walk
+                with open(file_path, 'rb') as file:
+                    if date_range is not None:
+                        byte_range = narrow_byte_range(byte_range, time_byte_range(file, *date_range, file_stat))
+                        date_range = None
+                    start, end = byte_range or (0, file_stat.st_size)
+                    ranges = chunk_ranges(file, start, end) if end - start > PARSE_CHUNK_BYTES else None
+            except OSError as e:
+                # The process reading the file as a whole reports the error
+                logger.warning("Error splitting file %s into chunks: %s", file_path, e)
+                ranges = None
+            if ranges is not None:
+                self.submit_batch()
+                for index, chunk in enumerate(ranges):
+                    self.submit([(file_path, file_stat, None, chunk)], [file_done if index == len(ranges) - 1 else None])
+                self.write_done(self.max_pending)
+                return
+
+        self.batch.append((file_path, file_stat, date_range, byte_range))
+        self.batch_bytes += file_stat.st_size if byte_range is None else byte_range[1] - byte_range[0]
+        self.batch_callbacks.append(file_done)
+        if self.batch_bytes >= PARSE_BATCH_BYTES or len(self.batch) >= PARSE_BATCH_FILES:
+            self.submit_batch()
+        self.write_done(self.max_pending)
+
+    # Function to send the batch of small files to the processes
+    def submit_batch(self):
+        if self.batch:
+            self.submit(self.batch, self.batch_callbacks)
+            self.batch = []
+            self.batch_bytes = 0
+            self.batch_callbacks = []
+
+    # Function to send a task to the processes, there is a callback or None for each piece, called once its results are written
+    def submit(self, pieces, callbacks):
+        future = self.pool.executor.submit(parse_pieces, self.mode, pieces, self.drive_name, self.is_non_standard, self.pool.n)
+        self.pending.append((future, pieces, callbacks))
+
+    # Function to write the results of the oldest tasks that are done, waiting for them while more than max_pending are queued
+    def write_done(self, max_pending):
+        while self.pending and (len(self.pending) > max_pending or self.pending[0][0].done()):
+            future, pieces, callbacks = self.pending.popleft()
+            try:
+                batches, found_terms, piece_counts = future.result()
+            except Exception as e:
+                logger.error("Error parsing %s in a parsing process: %s", ', '.join(piece[0] for piece in pieces), e)
+                batches, found_terms, piece_counts = [], set(), [(0, 0, 0.0)] * len(pieces)
+            self.found_terms.update(found_terms)
+            for results, seen_time in batches:
+                self.writer.write_results(results, seen_time)
+                self.result_count += len(results)
+            for callback, (result_count, bytes_read, seconds) in zip(callbacks, piece_counts):
+                self.file_counts[0] += result_count
+                self.file_counts[1] += bytes_read
+                self.file_counts[2] += seconds
+                if callback is not None:
+                    callback(*self.file_counts)
+                    self.file_counts = [0, 0, 0.0]
+
+    # Function to wait for the files added so far and write their results, it returns the number of results
+    def finish(self):
+        self.submit_batch()
+        self.write_done(0)
+        return self.result_count
@@ -0,0 +1,136 @@
+import csv
+import hashlib
+import logging
+import threading
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# Size of the output file buffer, so the results reach the disk in large writes instead of one write per line
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# Ways to pick the row of a uid group that is found more than once: the first one found, in the order of the
+# selected drives, or the one from the most recently modified log file
+UID_DEDUPE_MODES = ('first', 'latest')
+
+# Function to get a compact key for the uid group of a UID row (uid_in and the uid_assy values).
+# A 12 byte digest takes far less memory than the strings themselves on large result sets.
+def uid_group_key(row):
+    return hashlib.blake2b('\x1f'.join(row[2:]).encode('utf-8'), digest_size=12).digest()
+
+# Function to open an output file for streaming results into it, with append the results are added after the existing ones
+def open_output(output_path, newline=None, append=False):
+    return open(output_path, 'a' if append else 'w', buffering=OUTPUT_BUFFER_SIZE, newline=newline)
+
+# Class to stream the lines output to a file while the drives are searched.
+# Every drive thread writes its results in batches under one lock, so a result block is never split.
+class LineResultWriter:
+    def __init__(self, output_file, progress=None):
+        self.output_file = output_file
+        self.progress = progress
+        self.lock = threading.Lock()
+        self.result_count = 0
+        self.write_seconds = 0.0
+
+    # Function to write a batch of result blocks and pass them on to the live view,
+    # seen_time is only taken for the same calls as UidCsvWriter
+    def write_results(self, results, seen_time=None):
+        if not results:
+            return
+        with self.lock:
+            started = perf_counter()
+            self.output_file.write(''.join(result + "\n" for result in results))
+            self.result_count += len(results)
+            self.write_seconds += perf_counter() - started
+        if self.progress is not None:
+            self.progress.add_results(results)
+
+    # Function to write the search terms that were not found after the results
+    def write_not_found(self, not_found):
+        if not_found:
+            with self.lock:
+                self.output_file.write(f"\nNot Found Search Terms: {', '.join(not_found)}\n")
+
+# Class to stream the UID CSV output to a file while the drives are searched, rows are
+# drive name, station name, UID In and n UID Assy values.
+# Each uid group is written once for the whole search, however many files and drives it appears in.
+# The drives are searched at the same time, so the kept rows are written by finish() and ties between drives go
+# to the drive that comes first in drive_order, the selected drives. With keep='first' the first row of a group
+# on that drive is kept and the rows are written in drive order. With keep='latest' the row from the most recently
+# modified file is kept and the rows are written in the order the groups were first seen.
+# New groups reach the live view right away.
+class UidCsvWriter:
+    def __init__(self, output_file, n, progress=None, keep='first', write_header=True, drive_order=()):
+        if keep not in UID_DEDUPE_MODES:
+            raise ValueError(f"Unknown uid dedupe mode '{keep}', expected one of {', '.join(UID_DEDUPE_MODES)}")
+        self.csv_writer = csv.writer(output_file)
+        self.n = n
+        self.progress = progress
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.result_count = 0
+        self.write_seconds = 0.0
+        self.duplicate_count = 0
+        self.drive_ranks = {drive_name: rank for rank, drive_name in enumerate(drive_order)}
+        self.row_count = 0
+        # The kept row of each uid group with its drive rank, and its row number or the time of its file
+        self.first_rows = {}
+        self.latest_rows = {}
+
+        # Dynamically generate the header row based on n, rows appended to an existing output have it already
+        if write_header:
+            header = ['Drive Name', 'Station Name', 'UID In'] + [f'UID Assy {i + 1}' for i in range(n)]
+            self.csv_writer.writerow(header)
+
+    # Function to write a batch of UID rows and pass the new uid groups on to the live view.
+    # seen_time is the modification time of the file the rows come from.
+    def write_results(self, results, seen_time=None):
+        rows = []
+        for result in results:
+            if len(result) != self.n + 3:  # Ensure the result is the expected length
+                logger.warning("Unexpected result format: %s", result)
+                continue
+            if result[2] is None or any(assy is None for assy in result[3:]):
+                logger.warning("Incomplete UID data in result: %s", result)
+                continue
+            rows.append(result)
+        if not rows:
+            return
+
+        seen_time = seen_time or 0
+        new_rows = []
+        with self.lock:
+            started = perf_counter()
+            for row in rows:
+                key = uid_group_key(row)
+                rank = self.drive_ranks.get(row[0], len(self.drive_ranks))
+                kept_rows = self.latest_rows if self.keep == 'latest' else self.first_rows
+                kept = kept_rows.get(key)
+                if kept is None:
+                    new_rows.append(row)
+                else:
+                    self.duplicate_count += 1
+                if self.keep == 'latest':
+                    if kept is None or seen_time > kept[1] or (seen_time == kept[1] and rank <= kept[0]):
+                        self.latest_rows[key] = (rank, seen_time, row)
+                elif kept is None or rank < kept[0]:
+                    self.first_rows[key] = (rank, self.row_count, row)
+                self.row_count += 1
+            self.write_seconds += perf_counter() - started
+        if self.progress is not None and new_rows:
+            self.progress.add_results(new_rows)
+
+    # Function to write the kept rows once every drive is searched
+    def finish(self):
+        with self.lock:
+            started = perf_counter()
+            if self.keep == 'latest':
+                self.csv_writer.writerows(row for rank, seen_time, row in self.latest_rows.values())
+            else:
+                self.csv_writer.writerows(row for rank, row_number, row in sorted(self.first_rows.values(), key=lambda kept: kept[:2]))
+            self.result_count += len(self.latest_rows) + len(self.first_rows)
+            self.latest_rows.clear()
+            self.first_rows.clear()
+            self.write_seconds += perf_counter() - started
+            if self.duplicate_count:
+                logger.info("Skipped %d duplicate uid group rows", self.duplicate_count)
@@ -0,0 +1,232 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import platform
+import pstats
+import re
+import sys
+import threading
+from datetime import datetime
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# Version of the report layout, raised when fields change meaning
+RUN_REPORT_VERSION = 1
+
+# Pattern for the file names of the reports run_report_path gives, only these are cleaned up in the report directory
+RUN_REPORT_NAME_PATTERN = re.compile(r'\d{8}-\d{6}-\d{6}_(?:lines|uids|genealogy)\.json')
+
+# Number of functions of a profile listed in the report, the full profile is written next to it
+PROFILE_TOP_FUNCTIONS = 40
+
+# Before Python 3.12 a profiler only sees the thread that enabled it, so each drive thread gets its own.
+# From 3.12 on cProfile uses sys.monitoring, one profiler sees every thread and a second one cannot be enabled.
+PROFILE_PER_THREAD = sys.version_info < (3, 12)
+
+# Class for the counters of one drive in a run report. They are only updated by the thread searching the drive,
+# the results of a parse pool are counted on that thread too.
+class DriveReport:
+    def __init__(self, drive_name, drive_path):
+        self.drive_name = drive_name
+        self.drive_path = str(drive_path)
+        self.source = 'share'
+        self.agent_error = None
+        self.status = 'not started'
+        self.seconds = 0.0
+        self.files_read = 0
+        self.files_unchanged = 0
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self.matches = 0
+        self.walk = None
+        self.manifest = None
+        self.stations = {}
+
+    # Function to count a file that was read, with the matches it gave and the seconds it took
+    def file_read(self, station_name, size, matches, seconds):
+        self.files_read += 1
+        self.bytes_read += size
+        self.matches += matches
+        self.read_seconds += seconds
+        station = self.stations.get(station_name)
+        if station is None:
+            station = self.stations[station_name] = {'files_read': 0, 'bytes_read': 0, 'matches': 0, 'read_seconds': 0.0}
+        station['files_read'] += 1
+        station['bytes_read'] += size
+        station['matches'] += matches
+        station['read_seconds'] += seconds
+
+    # Function to keep the walk counts of the drive and the use of its directory manifest
+    def walk_done(self, stats, manifest=None):
+        self.walk = stats.as_dict()
+        if manifest is not None:
+            self.manifest = {'dirs_reused': manifest.dirs_reused, 'dirs_relisted': manifest.dirs_relisted}
+
+    def as_dict(self):
+        seconds = max(self.seconds, 0.001)
+        return {
+            'drive_name': self.drive_name,
+            'drive_path': self.drive_path,
+            'source': self.source,
+            'agent_error': self.agent_error,
+            'status': self.status,
+            'seconds': round(self.seconds, 3),
+            'files_read': self.files_read,
+            'files_unchanged': self.files_unchanged,
+            'bytes_read': self.bytes_read,
+            'read_seconds': round(self.read_seconds, 3),
+            'matches': self.matches,
+            'mb_per_second': round(self.bytes_read / seconds / 1e6, 2),
+            'walk': self.walk,
+            'manifest': self.manifest,
+            'stations': {name: dict(station, read_seconds=round(station['read_seconds'], 3))
+                         for name, station in sorted(self.stations.items())},
+        }
+
+# Class for the performance report of one search: time, bytes, files and matches per drive and station, the output
+# stage and optionally a cProfile capture. The profiler of the run covers the thread that creates it, and every thread
+# from Python 3.12 on. Before that each drive thread is profiled on its own and the profiles are merged when the report
+# is written. Files parsed in the processes of a parse pool are not profiled.
+class RunReport:
+    def __init__(self, mode, settings, profile=False):
+        self.mode = mode
+        self.settings = settings
+        self.started_at = datetime.now()
+        self.started = perf_counter()
+        self.seconds = None
+        self.lock = threading.Lock()
+        self.drives = {}
+        self.output = None
+        self.summary = None
+        self.stages = {}
+        self.profilers = []
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    # Function to get the report of a drive, it is created when the drive is first searched
+    def drive(self, drive_name, drive_path=''):
+        with self.lock:
+            drive_report = self.drives.get(drive_name)
+            if drive_report is None:
+                drive_report = self.drives[drive_name] = DriveReport(drive_name, drive_path)
+            return drive_report
+
+    # Function to call a function on a drive thread, under its own profiler when the run is profiled and needs one per thread
+    def profiled(self, function, *args):
+        if self.profiler is None or not PROFILE_PER_THREAD:
+            return function(*args)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function, *args)
+        finally:
+            with self.lock:
+                self.profilers.append(profiler)
+
+    # Function to add the seconds of a stage of the run that is not part of a drive, like answering a search from the UID index
+    def add_stage(self, name, seconds):
+        with self.lock:
+            self.stages[name] = round(self.stages.get(name, 0.0) + seconds, 3)
+
+    # Function to end the run with the summary of the search and the output writer
+    def finish(self, summary, writer=None):
+        self.seconds = perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.summary = {key: summary[key] for key in ('result_count', 'cancelled', 'error') if key in summary}
+        self.summary['not_found'] = len(summary.get('not_found', ()))
+        if writer is not None:
+            self.output = {'path': summary.get('output_path'), 'results_written': writer.result_count,
+                           'write_seconds': round(writer.write_seconds, 3)}
+
+    # Function to merge the profiles of the run, or None when it was not profiled
+    def profile_stats(self):
+        if self.profiler is None:
+            return None
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        with self.lock:
+            for profiler in self.profilers:
+                stats.add(profiler)
+        return stats
+
+    # Function to get the report as a dict, stats is the merged profile of a profiled run
+    def as_dict(self, stats=None, profile_path=None):
+        with self.lock:
+            drives = [drive_report.as_dict() for drive_report in self.drives.values()]
+        totals = {key: sum(drive[key] for drive in drives) for key in ('files_read', 'files_unchanged', 'bytes_read', 'matches')}
+        report = {
+            'version': RUN_REPORT_VERSION,
+            'mode': self.mode,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(self.seconds, 3) if self.seconds is not None else None,
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'settings': self.settings,
+            'summary': self.summary,
+            'totals': totals,
+            'stages': self.stages,
+            'output': self.output,
+            # The slowest drives first, they are the ones to look at
+            'drives': sorted(drives, key=lambda drive: drive['seconds'], reverse=True),
+        }
+        if stats is not None:
+            report['profile'] = {'path': profile_path, 'functions': top_functions(stats, PROFILE_TOP_FUNCTIONS)}
+        return report
+
+    # Function to write the report as JSON, and the merged profile next to it as a .prof file for pstats or snakeviz
+    def write(self, report_path):
+        directory = os.path.dirname(report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profile_path = None
+        stats = self.profile_stats()
+        if stats is not None:
+            profile_path = os.path.splitext(report_path)[0] + '.prof'
+            stats.dump_stats(profile_path)
+        with open(report_path, 'w') as report_file:
+            json.dump(self.as_dict(stats, profile_path), report_file, indent=2, default=str)
+        logger.info("Wrote the run report to %s", report_path)
+        return report_path
+
+# Function to list the functions of a profile with the most cumulative time, as dicts for the report
+def top_functions(stats, count):
+    functions = []
+    for (file_name, line_number, function_name), (primitive_calls, calls, total_seconds, cumulative_seconds, callers) in stats.stats.items():
+        functions.append({'function': f"{os.path.basename(file_name)}:{line_number}({function_name})", 'calls': calls,
+                          'total_seconds': round(total_seconds, 4), 'cumulative_seconds': round(cumulative_seconds, 4)})
+    functions.sort(key=lambda function: function['cumulative_seconds'], reverse=True)
+    return functions[:count]
+
+# Function to get the path of the report of a run in the report directory of the configuration, or None when reports are off.
+# Only the newest run_report_keep reports of the directory are kept, other files in it are left alone.
+def run_report_path(config, mode, started_at):
+    report_dir = config['run_report_dir']
+    if not report_dir:
+        return None
+    try:
+        os.makedirs(report_dir, exist_ok=True)
+        reports = sorted(name for name in os.listdir(report_dir) if RUN_REPORT_NAME_PATTERN.fullmatch(name))
+        for name in reports[:max(0, len(reports) - max(1, config['run_report_keep']) + 1)]:
+            os.remove(os.path.join(report_dir, name))
+            profile_path = os.path.join(report_dir, os.path.splitext(name)[0] + '.prof')
+            if os.path.exists(profile_path):
+                os.remove(profile_path)
+    except OSError as e:
+        logger.warning("Error cleaning up the run reports in %s: %s", report_dir, e)
+    return os.path.join(report_dir, f"{started_at:%Y%m%d-%H%M%S-%f}_{mode}.json")
+
+# Function to write the report of a run to report_path, or to the report directory of the configuration.
+# A report that cannot be written never fails the search, the path written is returned or None.
+def save_run_report(report, config, report_path=None):
+    try:
+        report_path = report_path or run_report_path(config, report.mode, report.started_at)
+        if report_path is None:
+            return None
+        return report.write(report_path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Error writing the run report: %s", e)
+        return None
@@ -0,0 +1,189 @@
+import argparse
+import hmac
+import ipaddress
+import logging
+import socketserver
+import sys
+import threading
+from datetime import datetime
+from time import monotonic
+
+from agent_client import AGENT_PROTOCOL_VERSION, DEFAULT_AGENT_PORT, send_message, iter_messages
+from log_matching import TermMatcher
+from log_setup import setup_logging
+from search_engine import traverse_directory, traverse_directory_uids
+
+logger = logging.getLogger(__name__)
+
+# Seconds between the progress messages an agent sends while it reads
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+# Seconds a client has to send its search request after connecting
+REQUEST_TIMEOUT_SECONDS = 10
+
+# Class to send the result batches of a search to the client instead of writing them to a file.
+# When the client is gone the search is stopped.
+class AgentResultWriter:
+    def __init__(self, connection, stop_event):
+        self.connection = connection
+        self.stop_event = stop_event
+
+    def write_results(self, results, seen_time=None):
+        if results and not self.stop_event.is_set():
+            try:
+                send_message(self.connection, {'results': results, 'seen_time': seen_time})
+            except OSError:
+                self.stop_event.set()
+                raise
+
+# Class to count the files an agent reads and send the counts to the client from time to time
+class AgentProgress:
+    def __init__(self, connection, stop_event):
+        self.connection = connection
+        self.stop_event = stop_event
+        self.files_found = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.last_sent = monotonic()
+
+    def file_found(self):
+        self.files_found += 1
+
+    def file_done(self, size):
+        self.files_done += 1
+        self.bytes_done += size
+        if monotonic() - self.last_sent >= PROGRESS_INTERVAL_SECONDS:
+            self.send()
+
+    # Function to send the counts so far, they also tell the client that the agent is still reading
+    def send(self):
+        self.last_sent = monotonic()
+        try:
+            send_message(self.connection, {'progress': {'files_found': self.files_found, 'files_done': self.files_done,
+                                                        'bytes_done': self.bytes_done}})
+        except OSError:
+            self.stop_event.set()
+
+# Class to handle one search of a client: read the request, search the logs under the agent root and stream back the results
+class AgentRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        connection = self.request
+        connection.settimeout(REQUEST_TIMEOUT_SECONDS)
+        try:
+            request = next(iter_messages(connection), None)
+        except (OSError, ValueError) as e:
+            logger.warning("Bad request from %s: %s", self.client_address[0], e)
+            return
+        if request is None:
+            return
+        connection.settimeout(None)
+
+        error = self.server.check_request(request)
+        if error:
+            logger.warning("Refused search from %s: %s", self.client_address[0], error)
+            send_message(connection, {'error': error})
+            return
+        send_message(connection, {'version': AGENT_PROTOCOL_VERSION})
+        logger.info("Searching %s for %s in %s mode", self.server.root_dir, self.client_address[0], request['mode'])
+
+        # The client closing the connection stops the search
+        stop_event = threading.Event()
+        watcher = threading.Thread(target=self.watch_client, args=(connection, stop_event), daemon=True)
+        watcher.start()
+
+        writer = AgentResultWriter(connection, stop_event)
+        progress = AgentProgress(connection, stop_event)
+        found_terms = set()
+        try:
+            matcher = TermMatcher(request['search_terms'], request.get('log_encoding'), request.get('log_decode_errors', 'replace'))
+            start_datetime = datetime.fromisoformat(request['start'])
+            end_datetime = datetime.fromisoformat(request['end'])
+            if request['mode'] == 'lines':
+                traverse_directory(self.server.root_dir, request['drive_name'], matcher, start_datetime, end_datetime, request['station_name'],
+                                   found_terms, writer, request['is_non_standard'], stop_event, progress=progress)
+            else:
+                traverse_directory_uids(self.server.root_dir, request['drive_name'], matcher, start_datetime, end_datetime, request['station_name'],
+                                        found_terms, writer, request['is_non_standard'], request['n'], stop_event, progress=progress)
+            if not stop_event.is_set():
+                progress.send()
+                send_message(connection, {'done': True, 'found_terms': sorted(found_terms)})
+        except Exception as e:
+            logger.error("Error searching for %s: %s", self.client_address[0], e)
+            try:
+                send_message(connection, {'error': str(e)})
+            except OSError:
+                pass
+        finally:
+            stop_event.set()
+
+    # Function to wait until the client closes the connection, it sends nothing after its request
+    def watch_client(self, connection, stop_event):
+        try:
+            while not stop_event.is_set() and connection.recv(1):
+                pass
+        except OSError:
+            pass
+        stop_event.set()
+
+# Class for the search agent of a production PC. It searches the logs under its root directory, which is the directory
+# that the drive path of the production PC points to on the share, and only sends the matching records over the network.
+class SearchAgent(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, root_dir, host='', port=DEFAULT_AGENT_PORT, token=''):
+        self.root_dir = root_dir
+        self.token = token
+        super().__init__((host, port), AgentRequestHandler)
+
+    # Function to check a search request, it returns the reason to refuse it or None
+    def check_request(self, request):
+        if request.get('version') != AGENT_PROTOCOL_VERSION:
+            return f"protocol version {request.get('version')} is not supported, the agent speaks version {AGENT_PROTOCOL_VERSION}"
+        if not hmac.compare_digest(str(request.get('token', '')).encode('utf-8'), self.token.encode('utf-8')):
+            return "wrong agent token"
+        if request.get('mode') not in ('lines', 'uids'):
+            return f"unknown search mode {request.get('mode')}"
+        return None
+
+# Function to start an agent on the loopback interface in a background thread, for testing the agent searches on one machine.
+# Returns the agent, its port is agent.server_address[1] and agent.shutdown() stops it.
+def start_loopback_agent(root_dir, port=0, token=''):
+    agent = SearchAgent(root_dir, '127.0.0.1', port, token)
+    threading.Thread(target=agent.serve_forever, daemon=True).start()
+    return agent
+
+# Function to check whether an agent listening on an address can only be reached from its own PC
+def is_loopback_address(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search agent that searches the logs of this production PC for the Unit ID search")
+    parser.add_argument('--root', required=True, help="log directory of this PC, the directory the drive path of the PC points to")
+    parser.add_argument('--bind', default='127.0.0.1',
+                        help="address to listen on, 0.0.0.0 to take searches from other PCs, which needs a --token (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_AGENT_PORT, help=f"port to listen on (default: {DEFAULT_AGENT_PORT})")
+    parser.add_argument('--token', default='', help="token the searches must send, the agent_token of their config file")
+    parser.add_argument('--log-path', default='UnitID_Agent_Log.txt', help="log file (default: UnitID_Agent_Log.txt)")
+    parser.add_argument('--log-level', default='INFO', help="log level (default: INFO)")
+    args = parser.parse_args(argv)
+    # Without a token anyone who reaches the agent can read every log line of the PC, an empty search term matches them all
+    if not args.token and not is_loopback_address(args.bind):
+        parser.error(f"listening on {args.bind} needs a --token, only a loopback agent can run without one")
+    setup_logging(args.log_path, args.log_level)
+
+    with SearchAgent(args.root, args.bind, args.port, args.token) as agent:
+        logger.info("Search agent for %s listening on %s:%d", args.root, *agent.server_address[:2])
+        try:
+            agent.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
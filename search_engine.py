@@ -0,0 +1,718 @@
+import os
+import re
+import csv
+import json
+import logging
+import threading
+from functools import lru_cache, partial
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, time
+from time import monotonic, perf_counter
+from log_matching import TermMatcher, iter_matching_lines, extract_uid_fields
+from log_archives import iter_log_members
+from uid_index import UidIndex
+from drive_walker import walk_log_files, open_drive_manifest, WalkStats, LINE_SEARCH_EXCLUDES, UID_SEARCH_EXCLUDES
+from result_writers import open_output, LineResultWriter, UidCsvWriter
+from log_tail import TailState, search_key, tail_state_path
+from parse_pool import ParsePool
+from agent_client import AgentUnavailable, agent_address, search_via_agent
+from run_report import RunReport, save_run_report
+
+logger = logging.getLogger(__name__)
+
+# Patterns for the station folder before the "Logs" folder, and the station name after its second underscore
+STATION_FOLDER_PATTERN = re.compile(r'([^\\\/]+)[\\\/]Logs[\\\/]', re.IGNORECASE)
+STATION_NAME_PATTERN = re.compile(r'^[^_]*_[^_]*_(.*)')
+
+# Number of results a file collects before they are handed to the output writer
+RESULT_BATCH_SIZE = 1000
+
+# Settings used when config.json does not define them
+DEFAULT_CONFIG = {
+    'output_path_uids': 'output_uids.csv',
+    'output_path_lines': 'output_lines.txt',
+    'output_path_genealogy': 'output_genealogy.csv',
+    'production_pc_path': 'production_pc.xlsx',
+    'production_pc_cache_path': 'production_pc_cache.json',
+    'number_of_columns': 4,
+    'max_parallel_drives': 8,
+    'max_connections_per_host': 2,
+    'drive_timeout_seconds': 900,
+    'uid_index_path': 'uid_index.sqlite',
+    'use_manifest_cache': True,
+    'manifest_cache_dir': 'manifest_cache',
+    'max_live_result_lines': 5000,
+    'uid_dedupe_keep': 'first',
+    'tail_state_dir': 'tail_state',
+    'log_encoding': None,
+    'log_decode_errors': 'replace',
+    'parse_processes': 0,
+    'agent_port': 0,
+    'agent_hosts': {},
+    'agent_token': '',
+    'agent_connect_timeout_seconds': 2,
+    'run_report_dir': 'run_reports',
+    'run_report_keep': 50,
+    'profile_searches': False,
+    'log_path': 'UnitID_Log.txt',
+    'log_level': 'INFO',
+    'log_max_bytes': 5 * 1024 * 1024,
+    'log_backup_count': 3,
+}
+
+# Function to load the configuration file, missing settings get their default value
+def load_config(config_path='config.json'):
+    with open(config_path, 'r') as config_file:
+        config = dict(DEFAULT_CONFIG)
+        config.update(json.load(config_file))
+    return config
+
+# Function to read production PC names and paths from the Excel file.
+# With a cache_path the list is kept in a small JSON file and read from there until the Excel file changes,
+# pandas and the Excel engine take seconds to import and are only loaded when it did.
+def read_production_pcs(file_path, cache_path=None):
+    started = perf_counter()
+    try:
+        file_stat = os.stat(file_path)
+        source = {'path': os.path.abspath(file_path), 'mtime': file_stat.st_mtime, 'size': file_stat.st_size}
+    except OSError as e:
+        logger.error("Error reading Excel file: %s", e)
+        return {}
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as cache_file:
+                cache = json.load(cache_file)
+            if cache.get('source') == source:
+                logger.info("Read %d production PCs from the cache in %.3f s", len(cache['production_pcs']), perf_counter() - started)
+                return cache['production_pcs']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Error reading production PC cache %s: %s", cache_path, e)
+
+    import pandas as pd
+
+    production_pcs = {}
+    try:
+        df = pd.read_excel(file_path, usecols=['drive_name', 'drive_path'])
+        production_pcs = dict(zip(df['drive_name'], df['drive_path']))
+    except Exception as e:
+        logger.error("Error reading Excel file: %s", e)
+        return production_pcs
+    logger.info("Read %d production PCs from %s in %.3f s", len(production_pcs), file_path, perf_counter() - started)
+
+    if cache_path:
+        try:
+            with open(cache_path, 'w') as cache_file:
+                json.dump({'source': source, 'production_pcs': production_pcs}, cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Error writing production PC cache %s: %s", cache_path, e)
+    return production_pcs
+
+# Function to read the search terms from the search_terms column of a CSV file
+# Excel saves "CSV UTF-8" with a byte order mark, which is skipped. A file without the column raises ValueError.
+def read_terms_file(file_path):
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as terms_file:
+        reader = csv.DictReader(terms_file)
+        if 'search_terms' not in (reader.fieldnames or []):
+            raise ValueError(f"{file_path} has no search_terms column")
+        return [row['search_terms'] for row in reader if row['search_terms']]
+
+# Function to extract the station name from the folder before the "Logs" folder
+def extract_station_name_from_logs(file_path):
+    # The station only depends on the directories of the path, so the patterns run once per directory
+    return station_name_of_directory(file_path[:max(file_path.rfind('/'), file_path.rfind('\\')) + 1])
+
+# Function to extract the station name of a directory path that ends with its separator, memoized for extract_station_name_from_logs
+@lru_cache(maxsize=4096)
+def station_name_of_directory(dir_path):
+    match = STATION_FOLDER_PATTERN.search(dir_path)
+    logger.debug("Station folder match for %s: %s", dir_path, match)
+    if match:
+        station_folder = match.group(1)
+        match_station = STATION_NAME_PATTERN.search(station_folder)
+        logger.debug("Station name match for %s: %s", station_folder, match_station)
+        if match_station:
+            station_name = match_station.group(1)
+            return station_name
+    return "Unknown Station"
+
+# Function to process the tracer files, the results go to the writer in batches. Returns (number of results, bytes read),
+# the bytes of a compressed log or an archive are the decompressed bytes of the files read from it.
+# The logs are scanned as raw bytes and only the lines with a hit are decoded, with the encoding and errors policy of the matcher.
+# Compressed logs and archives are decompressed on the fly, date_range (start, end timestamps) filters the files in an archive.
+# With a byte_range (start, end) only that part of a plain log is read. file_stat is the status of the file from the walk.
+def process_file(file_path, drive_name, matcher, found_terms, writer, is_non_standard, date_range=None, byte_range=None, file_stat=None):
+    result_count = 0
+    bytes_read = 0
+    results = []
+    try:
+        station_name = extract_station_name_from_logs(file_path)
+        for member_path, member_mtime, file in iter_log_members(file_path, is_non_standard, date_range, byte_range, file_stat):
+            # Results read from a compressed log or an archive also name the file they come from
+            source = f"{drive_name} - {station_name}" if member_path is None else f"{drive_name} - {station_name} - {member_path}"
+            for line, next_line in iter_matching_lines(file, matcher, with_next=True):
+                # Scan the line once for all search terms
+                hit_terms = matcher.find_terms(line)
+                if hit_terms:
+                    found_terms.update(hit_terms)
+                    result_message = f"{source}\n{line.strip()}\n"
+                    if 'UNIT_RESULT' in line and next_line is not None:
+                        result_message += f"{next_line.strip()}\n"
+                    results.append(result_message)
+                    if len(results) >= RESULT_BATCH_SIZE:
+                        writer.write_results(results)
+                        result_count += len(results)
+                        results = []
+            bytes_read += file.tell()
+    except Exception as e:
+        logger.error("Error processing file %s: %s", file_path, e)
+    writer.write_results(results)
+    return result_count + len(results), bytes_read
+
+# Function to traverse directories and process tracer files within a date range, it returns the number of results written.
+# With a tail_state only the data appended since the last run of the same search is read.
+# With a parse_pool the files are parsed by its processes, the results are written in the same order.
+# With a report (the DriveReport of the drive) the walk, the files read and their matches are counted in it.
+def traverse_directory(root_dir, drive_name, matcher, start_date, end_date, station_name, found_terms, writer, is_non_standard, stop_event=None, manifest=None, progress=None,
+                       tail_state=None, parse_pool=None, report=None):
+    result_count = 0
+    pipeline = None
+    stats = WalkStats()
+    try:
+        logger.info("Processing drive: %s at path: %s", drive_name, root_dir)
+        start_datetime, end_datetime = search_period(start_date, end_date)
+        date_range = (start_datetime.timestamp(), end_datetime.timestamp())
+        if parse_pool is not None:
+            pipeline = parse_pool.pipeline('lines', drive_name, writer, found_terms, is_non_standard)
+
+        for file_path, file_stat in walk_log_files(root_dir, station_name, is_non_standard, start_datetime, end_datetime,
+                                                   LINE_SEARCH_EXCLUDES, stop_event, stats, manifest, include_archives=True, line_dates=True):
+            if stop_event is not None and stop_event.is_set():
+                break
+            byte_range, tail_record = new_log_data(tail_state, file_path, file_stat, True)
+            if tail_record is False:
+                if report is not None:
+                    report.files_unchanged += 1
+                continue
+            if progress is not None:
+                progress.file_found()
+            logger.debug("Processing file: %s", file_path)
+            file_done = partial(file_processed, file_path, tail_state, tail_record, progress, report)
+            if pipeline is not None:
+                pipeline.add(file_path, file_stat, date_range, byte_range, file_done)
+            else:
+                started = perf_counter()
+                file_result_count, bytes_read = process_file(file_path, drive_name, matcher, found_terms, writer, is_non_standard, date_range,
+                                                             byte_range, file_stat)
+                result_count += file_result_count
+                file_done(file_result_count, bytes_read, perf_counter() - started)
+
+        if stop_event is not None and stop_event.is_set():
+            logger.info("Stopped traversing drive: %s", drive_name)
+        logger.info("Drive %s: %s", drive_name, stats)
+        if pipeline is not None:
+            result_count += pipeline.finish()
+        if manifest is not None:
+            manifest.save()
+            logger.info("Drive %s: reused %d cached directory listings, listed %d directories", drive_name, manifest.dirs_reused, manifest.dirs_relisted)
+
+    except Exception as e:
+        logger.error("Error traversing directory %s: %s", root_dir, e)
+    if report is not None:
+        report.walk_done(stats, manifest)
+    return result_count
+
+# Function to process files and extract UID details based on dynamic uid_assy fields.
+# The results go to the writer in batches, which drops the uid groups already found. Returns (number of results, bytes read).
+# seen_time is the modification time of the file. Compressed logs, archives, byte ranges and file_stat are taken like in process_file.
+def process_file_uids(file_path, drive_name, matcher, found_terms, writer, is_non_standard, n, seen_time=None, date_range=None, byte_range=None,
+                      file_stat=None):
+    result_count = 0
+    bytes_read = 0
+    results = []
+
+    # The number of subassemblies is validated by the caller
+    if n <= 0:
+        return result_count, bytes_read
+
+    source_time = seen_time
+    station_name = extract_station_name_from_logs(file_path)
+    try:
+        for member_path, member_mtime, file in iter_log_members(file_path, is_non_standard, date_range, byte_range, file_stat):
+            source_path = member_path or file_path
+            source_time = member_mtime or seen_time
+            for line, _ in iter_matching_lines(file, matcher):
+                # Scan the line once for all search terms
+                hit_terms = matcher.find_terms(line)
+                if hit_terms:
+                    found_terms.update(hit_terms)
+
+                    # Extract uid_in and uid_assy_1 to uid_assy_n in one pass, missing assy values keep the columns aligned
+                    uid_in, uid_assy_list = extract_uid_fields(line, n)
+
+                    # Only append results if uid_in is found, repeated uid groups are dropped by the writer
+                    if uid_in:
+                        logger.debug("UID match in %s at station %s: %s", source_path, station_name, uid_in)
+                        # Append drive_name, station_name, uid_in, and uid_assy_list
+                        result_message = [drive_name, station_name, uid_in] + uid_assy_list
+                        results.append(result_message)
+                        if len(results) >= RESULT_BATCH_SIZE:
+                            writer.write_results(results, source_time)
+                            result_count += len(results)
+                            results = []
+            # The rows of each file in an archive go to the writer with the date of that file
+            writer.write_results(results, source_time)
+            result_count += len(results)
+            results = []
+            bytes_read += file.tell()
+    except Exception as e:
+        logger.error("Error processing file %s: %s", file_path, e)
+
+    writer.write_results(results, source_time)
+    return result_count + len(results), bytes_read
+
+# Function to traverse directories and process files for UID extraction within a date range, it returns the number of results written.
+# With a tail_state only the data appended since the last run of the same search is read.
+# With a parse_pool the files are parsed by its processes, the results are written in the same order.
+# With a report (the DriveReport of the drive) the walk, the files read and their matches are counted in it.
+def traverse_directory_uids(root_dir, drive_name, matcher, start_date, end_date, station_name, found_terms, writer, is_non_standard, n, stop_event=None, uid_index=None, manifest=None, progress=None,
+                            tail_state=None, parse_pool=None, report=None):
+    result_count = 0
+    pipeline = None
+    stats = WalkStats()
+    try:
+        logger.info("Processing drive: %s at path: %s", drive_name, root_dir)
+        start_datetime, end_datetime = search_period(start_date, end_date)
+        date_range = (start_datetime.timestamp(), end_datetime.timestamp())
+        if parse_pool is not None and uid_index is None:
+            pipeline = parse_pool.pipeline('uids', drive_name, writer, found_terms, is_non_standard)
+
+        # The UID index only holds whole plain log files, archives and line dates are read by the searches over the log files
+        for file_path, file_stat in walk_log_files(root_dir, station_name, is_non_standard, start_datetime, end_datetime,
+                                                   UID_SEARCH_EXCLUDES, stop_event, stats, manifest,
+                                                   include_archives=uid_index is None, line_dates=uid_index is None):
+            if stop_event is not None and stop_event.is_set():
+                break
+            byte_range, tail_record = new_log_data(tail_state, file_path, file_stat, False)
+            if tail_record is False:
+                if report is not None:
+                    report.files_unchanged += 1
+                continue
+            if progress is not None:
+                progress.file_found()
+            file_done = partial(file_processed, file_path, tail_state, tail_record, progress, report)
+            started = perf_counter()
+            if uid_index is not None:
+                indexed = uid_index.refresh_file(file_path, drive_name, extract_station_name_from_logs(file_path), file_stat)
+                file_done(0, file_stat.st_size if indexed else 0, perf_counter() - started)
+            elif pipeline is not None:
+                pipeline.add(file_path, file_stat, date_range, byte_range, file_done)
+            else:
+                logger.debug("Calling process_file_uids with file path: %s", file_path)
+                file_result_count, bytes_read = process_file_uids(file_path, drive_name, matcher, found_terms, writer, is_non_standard, n,
+                                                                  file_stat.st_mtime, date_range, byte_range, file_stat)
+                result_count += file_result_count
+                file_done(file_result_count, bytes_read, perf_counter() - started)
+
+        if stop_event is not None and stop_event.is_set():
+            logger.info("Stopped traversing drive: %s", drive_name)
+        logger.info("Drive %s: %s", drive_name, stats)
+        if pipeline is not None:
+            result_count += pipeline.finish()
+        if manifest is not None:
+            manifest.save()
+            logger.info("Drive %s: reused %d cached directory listings, listed %d directories", drive_name, manifest.dirs_reused, manifest.dirs_relisted)
+
+    except Exception as e:
+        logger.error("Error traversing directory %s: %s", root_dir, e)
+    if report is not None:
+        report.walk_done(stats, manifest)
+    return result_count
+
+# Function to record a file as done once its results are written, in the progress, in the read offsets of an incremental search
+# and in the report of the drive with the number of results it gave, the bytes read from it and the seconds it took to read
+def file_processed(file_path, tail_state, tail_record, progress, report, result_count=0, bytes_read=0, seconds=0.0):
+    if tail_record is not None:
+        tail_state.update(file_path, tail_record)
+    if progress is not None:
+        progress.file_done(bytes_read)
+    if report is not None:
+        report.file_read(extract_station_name_from_logs(file_path), bytes_read, result_count, seconds)
+
+# Function to start the processes that parse the log files, or None when the search parses them on the drive threads
+def open_parse_pool(config, matcher, n=0):
+    processes = config['parse_processes']
+    if processes is None or processes <= 0:
+        return None
+    return ParsePool(processes, matcher, n)
+
+# Function to get the start and end datetimes of a search period, a date without a time covers the whole day
+def search_period(start_date, end_date):
+    start_datetime = start_date if isinstance(start_date, datetime) else datetime.combine(start_date, time.min)
+    end_datetime = end_date if isinstance(end_date, datetime) else datetime.combine(end_date, time.max)
+    return start_datetime, end_datetime
+
+# Function to find the part of a file to read in an incremental search, as (byte range, tail record).
+# The byte range is None to read the whole file, the tail record is None without a tail_state and False when there is nothing new.
+def new_log_data(tail_state, file_path, file_stat, hold_unit_result):
+    if tail_state is None:
+        return None, None
+    planned = tail_state.plan_read(file_path, file_stat, hold_unit_result)
+    if planned is None:
+        return None, False
+    return planned
+
+# Function to open the read offsets of an incremental search, they start over when the search settings or the output changed
+def open_tail_state(config, output_path, *search_settings):
+    tail_state = TailState(tail_state_path(config['tail_state_dir'], output_path), search_key(*search_settings))
+    if not os.path.exists(output_path):
+        tail_state.reset()
+    return tail_state
+
+# Function to search a drive through the search agent on its production PC, which reads the logs next to them and only
+# sends back the matching records. Without an agent for the drive, or when it does not answer, traverse_local searches
+# the drive over the share. request holds the search settings for the agent, it returns the number of results written.
+# The report of the drive records which of the two searched it.
+def search_drive(config, drive_name, drive_path, request, writer, found_terms, stop_event, progress, traverse_local, report=None):
+    address = agent_address(config, drive_name, drive_path) if request is not None else None
+    if address is not None:
+        start_datetime, end_datetime = search_period(request['start'], request['end'])
+        request = dict(request, drive_name=drive_name, token=config['agent_token'],
+                       start=start_datetime.isoformat(), end=end_datetime.isoformat())
+        try:
+            result_count = search_via_agent(address, request, writer, found_terms, stop_event, progress, config['agent_connect_timeout_seconds'])
+            logger.info("Drive %s: %d results from the search agent at %s:%s", drive_name, result_count, *address)
+            if report is not None:
+                report.source = 'agent'
+                report.matches = result_count
+            return result_count
+        except AgentUnavailable as e:
+            logger.info("No search agent for drive %s at %s:%s, searching it over the share: %s", drive_name, *address, e)
+            if report is not None:
+                report.agent_error = str(e)
+    return traverse_local()
+
+# Function to update the UID index with the new or changed log files of a drive
+def refresh_drive_index(config, drive_path, drive_name, matcher, start_date, end_date, station_name, is_non_standard, n, stop_event=None, manifest=None, progress=None,
+                        report=None):
+    with UidIndex(config['uid_index_path'], config['log_encoding'], config['log_decode_errors']) as uid_index:
+        return traverse_directory_uids(drive_path, drive_name, matcher, start_date, end_date, station_name, set(), None, is_non_standard, n, stop_event, uid_index, manifest, progress,
+                                       report=report)
+
+# Function to open the cached directory listings of a drive, or None when the cache is disabled
+def drive_manifest(config, drive_name, drive_path, full_rescan):
+    if not config['use_manifest_cache']:
+        return None
+    return open_drive_manifest(config['manifest_cache_dir'], drive_name, drive_path, full_rescan)
+
+# Function to get the production PC behind a drive path, used to limit connections per host
+def drive_host(drive_path):
+    path = str(drive_path).replace('/', '\\')
+    if path.startswith('\\\\'):
+        return path.lstrip('\\').split('\\', 1)[0].lower()
+    return path.split('\\', 1)[0].lower()
+
+# Class to pass the progress and the new results of a running search from the worker threads to the window or the command line.
+# Only the most recent max_live_results results are kept for the live view, the output file has all of them.
+class SearchProgress:
+    def __init__(self, max_live_results=None):
+        self.lock = threading.Lock()
+        self.started = monotonic()
+        self.drives_total = 0
+        self.drives_done = 0
+        self.current_drives = []
+        self.files_found = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.matches = 0
+        self.new_results = deque(maxlen=max_live_results)
+
+    def drive_started(self, drive_name):
+        with self.lock:
+            self.current_drives.append(drive_name)
+
+    def drive_finished(self, drive_name):
+        with self.lock:
+            if drive_name in self.current_drives:
+                self.current_drives.remove(drive_name)
+            self.drives_done += 1
+
+    def file_found(self):
+        with self.lock:
+            self.files_found += 1
+
+    def file_done(self, size):
+        with self.lock:
+            self.files_done += 1
+            self.bytes_done += size
+
+    # Function to add the file counts reported by a search agent
+    def add_file_counts(self, files_found, files_done, bytes_done):
+        with self.lock:
+            self.files_found += files_found
+            self.files_done += files_done
+            self.bytes_done += bytes_done
+
+    def add_results(self, results):
+        lines = [result.rstrip('\n') if isinstance(result, str) else ', '.join(result) for result in results]
+        with self.lock:
+            self.matches += len(results)
+            self.new_results.extend(lines)
+
+    # Function to take up to limit new results for the live view
+    def take_results(self, limit=None):
+        with self.lock:
+            if limit is None or limit >= len(self.new_results):
+                taken = list(self.new_results)
+                self.new_results.clear()
+            else:
+                taken = [self.new_results.popleft() for _ in range(limit)]
+        return taken
+
+    def describe(self):
+        with self.lock:
+            elapsed = max(monotonic() - self.started, 0.001)
+            current = ', '.join(self.current_drives) or '-'
+            return (f"Drives {self.drives_done}/{self.drives_total} done, searching: {current} | "
+                    f"Files {self.files_done}/{self.files_found} | Matches {self.matches} | "
+                    f"{self.files_done / elapsed:.1f} files/s, {self.bytes_done / elapsed / 1e6:.1f} MB/s")
+
+# Function to get the settings of a search for its run report, the search terms are only counted
+def report_settings(config, search_terms, start_date, end_date, station_name, drives, is_non_standard, **options):
+    settings = {'search_terms': len(search_terms), 'start': str(start_date), 'end': str(end_date), 'station_name': station_name,
+                'is_non_standard': is_non_standard, 'drives': len(drives)}
+    settings.update(options)
+    settings.update((key, config[key]) for key in ('max_parallel_drives', 'max_connections_per_host', 'parse_processes', 'use_manifest_cache'))
+    return settings
+
+# Function to search the drives concurrently and return the search terms that were found.
+# drives is a list of (drive name, drive path) pairs, the drives write their results to the output writer themselves.
+# With a report (a RunReport) the time and the outcome of each drive are recorded, and the drives are profiled if it is.
+def search_drives(drives, traverse_drive, config, progress=None, cancel_event=None, report=None):
+    max_parallel_drives = config['max_parallel_drives']
+    max_connections_per_host = config['max_connections_per_host']
+    drive_timeout_seconds = config['drive_timeout_seconds']
+
+    # Each drive collects its own found terms so that worker threads never share state
+    drive_states = {}
+    for drive_name, drive_path in drives:
+        if drive_path:
+            drive_states[drive_name] = {
+                'path': drive_path,
+                'found_terms': set(),
+                'stop_event': threading.Event(),
+                'started': None,
+            }
+
+    host_semaphores = {}
+    for state in drive_states.values():
+        host = drive_host(state['path'])
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.Semaphore(max_connections_per_host)
+        state['semaphore'] = host_semaphores[host]
+
+    if progress is not None:
+        progress.drives_total = len(drive_states)
+
+    def run_drive(drive_name):
+        state = drive_states[drive_name]
+        with state['semaphore']:
+            state['started'] = monotonic()
+            if state['stop_event'].is_set():
+                return 0
+            if progress is not None:
+                progress.drive_started(drive_name)
+            drive_report = None if report is None else report.drive(drive_name, state['path'])
+            try:
+                if drive_report is None:
+                    return traverse_drive(state['path'], drive_name, state['found_terms'], state['stop_event'])
+                drive_report.status = 'running'
+                result_count = report.profiled(traverse_drive, state['path'], drive_name, state['found_terms'], state['stop_event'])
+                # A drive that timed out keeps that status
+                if drive_report.status == 'running':
+                    drive_report.status = 'stopped' if state['stop_event'].is_set() else 'done'
+                return result_count
+            except Exception:
+                if drive_report is not None:
+                    drive_report.status = 'error'
+                raise
+            finally:
+                if drive_report is not None:
+                    drive_report.seconds = monotonic() - state['started']
+                if progress is not None:
+                    progress.drive_finished(drive_name)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_parallel_drives))
+    futures = {executor.submit(run_drive, drive_name): drive_name for drive_name in drive_states}
+    timed_out = set()
+    try:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            # Stop every drive when the search was cancelled, the results found so far are kept
+            if cancel_event is not None and cancel_event.is_set():
+                for state in drive_states.values():
+                    state['stop_event'].set()
+            # Give up on drives that have been running longer than the per-drive timeout
+            for future in list(pending):
+                state = drive_states[futures[future]]
+                if state['started'] is not None and monotonic() - state['started'] > drive_timeout_seconds:
+                    logger.warning("Timed out searching drive %s after %s s", futures[future], drive_timeout_seconds)
+                    if report is not None:
+                        report.drive(futures[future], state['path']).status = 'timed out'
+                    state['stop_event'].set()
+                    timed_out.add(future)
+                    pending.discard(future)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    found_terms = set()
+    for future, drive_name in futures.items():
+        state = drive_states[drive_name]
+        if future in timed_out:
+            # The results of a timed out drive are already in the output, so its terms count as found.
+            # The drive may still be stopping, so its set is copied rather than iterated.
+            found_terms.update(state['found_terms'].copy())
+            continue
+        try:
+            future.result()
+        except Exception as e:
+            logger.error("Error searching drive %s: %s", drive_name, e)
+        found_terms.update(state['found_terms'])
+
+    return found_terms
+
+# Function to run a line search and stream the results to the lines output. drives is a list of (drive name, drive path) pairs.
+# It does not touch any widget, so it can run on a worker thread of the window or from the command line.
+# An incremental search only reads what was appended to the logs since its last run and adds the new results to the output.
+# A run report is written to report_path, or to the run report directory of the configuration, its path is in the summary.
+def run_line_search(search_terms, start_date, end_date, station_name, drives, is_non_standard, output_path, config,
+                    full_rescan=False, incremental=False, progress=None, cancel_event=None, report_path=None):
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    report = RunReport('lines', report_settings(config, search_terms, start_date, end_date, station_name, drives, is_non_standard,
+                                                full_rescan=full_rescan, incremental=incremental), config['profile_searches'])
+
+    # Compile the search terms once for the whole search
+    matcher = TermMatcher(search_terms, config['log_encoding'], config['log_decode_errors'])
+
+    tail_state = None
+    if incremental:
+        tail_state = open_tail_state(config, output_path, 'lines', sorted(set(search_terms)), start_date, station_name, drives, is_non_standard)
+
+    # Drives with a search agent are searched by it, except in incremental searches which keep their read offsets here
+    agent_request = None if incremental else {'mode': 'lines', 'search_terms': list(search_terms), 'start': start_date, 'end': end_date,
+                                              'station_name': station_name, 'is_non_standard': is_non_standard,
+                                              'log_encoding': config['log_encoding'], 'log_decode_errors': config['log_decode_errors']}
+
+    summary = {'output_path': output_path, 'result_count': 0, 'cancelled': False,
+               'not_found': [], 'report_empty': False, 'error': None}
+    parse_pool = open_parse_pool(config, matcher)
+    writer = None
+    try:
+        with open_output(output_path, append=tail_state is not None and not tail_state.is_new) as output_file:
+            writer = LineResultWriter(output_file, progress)
+            found_terms = search_drives(
+                drives,
+                lambda drive_path, drive_name, drive_found_terms, stop_event: search_drive(
+                    config, drive_name, drive_path, agent_request, writer, drive_found_terms, stop_event, progress,
+                    lambda: traverse_directory(
+                        drive_path, drive_name, matcher, start_date, end_date, station_name, drive_found_terms, writer, is_non_standard, stop_event,
+                        drive_manifest(config, drive_name, drive_path, full_rescan), progress, tail_state, parse_pool, report.drive(drive_name)),
+                    report.drive(drive_name)),
+                config, progress, cancel_event, report)
+
+            # Compare the found terms with the original search terms. An incremental output grows with every run,
+            # so the terms not found so far are only reported and not written to it.
+            if tail_state is None:
+                summary['not_found'] = list(set(search_terms) - found_terms)
+                writer.write_not_found(summary['not_found'])
+            else:
+                tail_state.found_terms.update(found_terms)
+                summary['not_found'] = list(set(search_terms) - tail_state.found_terms)
+            summary['result_count'] = writer.result_count
+    except Exception as e:
+        summary['error'] = f"Could not write to file: {e}"
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel=True)
+
+    if tail_state is not None:
+        tail_state.save()
+    summary['cancelled'] = cancel_event.is_set()
+    report.finish(summary, writer)
+    summary['report_path'] = save_run_report(report, config, report_path)
+    return summary
+
+# Function to run a UID search and stream the results to the UID CSV output. drives is a list of (drive name, drive path) pairs.
+# It does not touch any widget, so it can run on a worker thread of the window or from the command line.
+# An incremental search only reads what was appended to the logs since its last run and adds the new rows to the output.
+# Index searches are answered from the index as a whole, they are never incremental.
+# A run report is written like for run_line_search.
+def run_uid_search(search_terms, start_date, end_date, station_name, drives, is_non_standard, n, output_path, config,
+                   use_index=False, full_rescan=False, incremental=False, progress=None, cancel_event=None, report_path=None):
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    report = RunReport('uids', report_settings(config, search_terms, start_date, end_date, station_name, drives, is_non_standard, n=n,
+                                               use_index=use_index, full_rescan=full_rescan, incremental=incremental, uid_dedupe_keep=config['uid_dedupe_keep']),
+                       config['profile_searches'])
+
+    # Compile the search terms once for the whole search
+    matcher = TermMatcher(search_terms, config['log_encoding'], config['log_decode_errors'])
+
+    tail_state = None
+    if incremental and not use_index:
+        tail_state = open_tail_state(config, output_path, 'uids', sorted(set(search_terms)), start_date, station_name, drives, is_non_standard, n)
+    append = tail_state is not None and not tail_state.is_new
+
+    # Drives with a search agent are searched by it, except in incremental searches which keep their read offsets here
+    agent_request = None if incremental else {'mode': 'uids', 'search_terms': list(search_terms), 'start': start_date, 'end': end_date,
+                                              'station_name': station_name, 'is_non_standard': is_non_standard, 'n': n,
+                                              'log_encoding': config['log_encoding'], 'log_decode_errors': config['log_decode_errors']}
+
+    summary = {'output_path': output_path, 'result_count': 0, 'cancelled': False,
+               'not_found': [], 'report_empty': True, 'error': None}
+    parse_pool = None if use_index else open_parse_pool(config, matcher, n)
+    writer = None
+    try:
+        with open_output(output_path, newline='', append=append) as output_file:
+            writer = UidCsvWriter(output_file, n, progress, config['uid_dedupe_keep'], write_header=not append,
+                                  drive_order=[drive_name for drive_name, drive_path in drives])
+            if use_index:
+                # Bring the index up to date for new or changed files, then answer the search from it
+                search_drives(drives, lambda drive_path, drive_name, drive_found_terms, stop_event: refresh_drive_index(
+                    config, drive_path, drive_name, matcher, start_date, end_date, station_name, is_non_standard, n, stop_event,
+                    drive_manifest(config, drive_name, drive_path, full_rescan), progress, report.drive(drive_name)), config, progress, cancel_event, report)
+                started = perf_counter()
+                with UidIndex(config['uid_index_path']) as uid_index:
+                    results, _ = uid_index.find_uids(
+                        search_terms, *search_period(start_date, end_date),
+                        station_name, [drive_name for drive_name, drive_path in drives], is_non_standard, n, with_mtime=True)
+                report.add_stage('index_query', perf_counter() - started)
+                for file_mtime, row in results:
+                    writer.write_results([row], file_mtime)
+            else:
+                search_drives(
+                    drives,
+                    lambda drive_path, drive_name, drive_found_terms, stop_event: search_drive(
+                        config, drive_name, drive_path, agent_request, writer, drive_found_terms, stop_event, progress,
+                        lambda: traverse_directory_uids(
+                            drive_path, drive_name, matcher, start_date, end_date, station_name, drive_found_terms, writer, is_non_standard, n, stop_event,
+                            None, drive_manifest(config, drive_name, drive_path, full_rescan), progress, tail_state, parse_pool, report.drive(drive_name)),
+                        report.drive(drive_name)),
+                    config, progress, cancel_event, report)
+            writer.finish()
+            summary['result_count'] = writer.result_count
+    except Exception as e:
+        summary['error'] = f"Could not write to file: {e}"
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel=True)
+
+    if tail_state is not None:
+        tail_state.save()
+    summary['cancelled'] = cancel_event.is_set()
+    report.finish(summary, writer)
+    summary['report_path'] = save_run_report(report, config, report_path)
+    return summary
@@ -0,0 +1,197 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from log_matching import TermMatcher, open_log_binary, iter_matching_line_offsets, parse_uid_attributes, uid_assy_positions, UID_IN_MARKER
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    drive TEXT NOT NULL,
+    station TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uid_records (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line_offset INTEGER NOT NULL,
+    uid_in TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uid_assy (
+    record_id INTEGER NOT NULL REFERENCES uid_records(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    uid TEXT NOT NULL,
+    PRIMARY KEY (record_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_files_drive_mtime ON files(drive, mtime);
+CREATE INDEX IF NOT EXISTS idx_uid_records_file ON uid_records(file_id);
+CREATE INDEX IF NOT EXISTS idx_uid_records_uid_in ON uid_records(uid_in);
+CREATE INDEX IF NOT EXISTS idx_uid_assy_uid ON uid_assy(uid);
+"""
+
+# Filename rules of the two log kinds, matching the rules used when walking the drives
+STANDARD_NAME_FILTER = "(lower(f.name) LIKE 'vitescoappmonitoringservice.log.%' OR lower(f.name) LIKE '%tracer.txt')"
+NON_STANDARD_NAME_FILTER = "(lower(f.name) LIKE 'logging%' OR lower(f.name) LIKE '%.log')"
+
+# Serialises schema creation when several drive threads open the index at the same time
+_schema_lock = threading.Lock()
+
+# Class for the on-disk index of UID records extracted from the scanned log files.
+# Files are keyed by path, size and mtime and only re-read when one of them changes.
+# Every thread has to open its own UidIndex, sqlite connections are not shared.
+# encoding and errors are the ones the log files are decoded with when they are indexed, see TermMatcher.
+class UidIndex:
+    def __init__(self, index_path, encoding=None, errors='replace'):
+        self.index_path = index_path
+        self.marker_matcher = TermMatcher([UID_IN_MARKER], encoding, errors)
+        self.conn = sqlite3.connect(index_path, timeout=60)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        with _schema_lock:
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to re-index a log file if it is new or has changed since it was indexed
+    def refresh_file(self, file_path, drive_name, station_name, file_stat=None):
+        if file_stat is None:
+            file_stat = os.stat(file_path)
+
+        row = self.conn.execute("SELECT size, mtime FROM files WHERE path = ?", (file_path,)).fetchone()
+        if row is not None and row[0] == file_stat.st_size and row[1] == file_stat.st_mtime:
+            return False
+
+        try:
+            records = extract_uid_records(file_path, self.marker_matcher)
+        except Exception as e:
+            logger.error("Error indexing file %s: %s", file_path, e)
+            return False
+
+        directory, name = os.path.split(file_path)
+        with self.conn:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (file_path,))
+            file_id = self.conn.execute(
+                "INSERT INTO files (path, drive, station, directory, name, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_path, drive_name, station_name, directory, name, file_stat.st_size, file_stat.st_mtime)).lastrowid
+            for line_offset, uid_in, uid_assy in records:
+                record_id = self.conn.execute(
+                    "INSERT INTO uid_records (file_id, line_offset, uid_in) VALUES (?, ?, ?)",
+                    (file_id, line_offset, uid_in)).lastrowid
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO uid_assy (record_id, position, uid) VALUES (?, ?, ?)",
+                    [(record_id, position, uid) for position, uid in uid_assy.items()])
+        return True
+
+    # Function to look up serial numbers in the index. A term matches a record when it equals its uid_in
+    # or one of its uid_assy values. Returns the rows in the UID CSV layout and the terms that were found.
+    def find_uids(self, search_terms, start_datetime, end_datetime, station_name, drives, is_non_standard, n, with_mtime=False):
+        drive_order = {drive: index for index, drive in enumerate(drives)}
+        if not drive_order:
+            return [], set()
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_terms (term TEXT PRIMARY KEY)")
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_drives (drive TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM lookup_terms")
+        self.conn.execute("DELETE FROM lookup_drives")
+        self.conn.executemany("INSERT OR IGNORE INTO lookup_terms VALUES (?)", [(term,) for term in search_terms])
+        self.conn.executemany("INSERT OR IGNORE INTO lookup_drives VALUES (?)", [(drive,) for drive in drive_order])
+
+        file_filter = f"""
+            f.drive IN (SELECT drive FROM lookup_drives)
+            AND f.mtime BETWEEN ? AND ?
+            AND instr(lower(f.directory), ?) > 0
+            AND {NON_STANDARD_NAME_FILTER if is_non_standard else STANDARD_NAME_FILTER}
+        """
+        params = (start_datetime.timestamp(), end_datetime.timestamp(), station_name.lower())
+        query = f"""
+            SELECT f.drive, f.station, f.path, f.mtime, r.line_offset, r.id, r.uid_in, t.term
+            FROM lookup_terms t
+            JOIN uid_records r ON r.uid_in = t.term
+            JOIN files f ON f.id = r.file_id
+            WHERE {file_filter}
+            UNION
+            SELECT f.drive, f.station, f.path, f.mtime, r.line_offset, r.id, r.uid_in, t.term
+            FROM lookup_terms t
+            JOIN uid_assy a ON a.uid = t.term
+            JOIN uid_records r ON r.id = a.record_id
+            JOIN files f ON f.id = r.file_id
+            WHERE {file_filter}
+        """
+        rows = self.conn.execute(query, params + params).fetchall()
+
+        found_terms = {row[7] for row in rows}
+        records = {}
+        for drive, station, path, mtime, line_offset, record_id, uid_in, term in rows:
+            records[record_id] = (drive_order[drive], path, line_offset, drive, station, uid_in, mtime)
+
+        assy_by_record = {}
+        record_ids = list(records)
+        for start in range(0, len(record_ids), 500):
+            chunk = record_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for record_id, position, uid in self.conn.execute(
+                    f"SELECT record_id, position, uid FROM uid_assy WHERE record_id IN ({placeholders})", chunk):
+                assy_by_record.setdefault(record_id, {})[position] = uid
+
+        # Keep the drive, file and line order of a search over the log files, one row per uid group and file
+        results = []
+        processed_uid_groups = set()
+        for record_id, (order, path, line_offset, drive, station, uid_in, mtime) in sorted(records.items(), key=lambda item: item[1][:3]):
+            uid_assy = assy_by_record.get(record_id, {})
+            uid_assy_list = [uid_assy.get(j, '') for j in range(1, n + 1)]
+            uid_group = (path, uid_in, tuple(uid_assy_list))
+            if uid_group not in processed_uid_groups:
+                processed_uid_groups.add(uid_group)
+                row = [drive, station, uid_in] + uid_assy_list
+                # With with_mtime the rows come as (file mtime, row) pairs
+                results.append((mtime, row) if with_mtime else row)
+        return results, found_terms
+
+    # Function to list all UID records of the indexed files of the drives modified within a date range,
+    # as (drive, station, uid_in, {position: uid_assy}) in drive, file and line order
+    def iter_records(self, start_datetime, end_datetime, drives, is_non_standard):
+        drive_order = {drive: index for index, drive in enumerate(drives)}
+        query = f"""
+            SELECT f.drive, f.station, r.id, r.uid_in, a.position, a.uid
+            FROM files f
+            JOIN uid_records r ON r.file_id = f.id
+            LEFT JOIN uid_assy a ON a.record_id = r.id
+            WHERE f.mtime BETWEEN ? AND ?
+            AND {NON_STANDARD_NAME_FILTER if is_non_standard else STANDARD_NAME_FILTER}
+            ORDER BY f.drive, f.path, r.line_offset, a.position
+        """
+        records = {}
+        for drive, station, record_id, uid_in, position, uid in self.conn.execute(query, (start_datetime.timestamp(), end_datetime.timestamp())):
+            if drive not in drive_order:
+                continue
+            record = records.setdefault(record_id, (drive_order[drive], drive, station, uid_in, {}))
+            if position is not None:
+                record[4][position] = uid
+        for order, drive, station, uid_in, uid_assy in sorted(records.values(), key=lambda record: record[0]):
+            yield drive, station, uid_in, uid_assy
+
+# Function to read all UID records of a log file as (line offset, uid_in, {position: uid_assy}), marker_matcher finds their lines
+def extract_uid_records(file_path, marker_matcher):
+    records = []
+    with open_log_binary(file_path) as file:
+        # The lines are scanned as bytes like in the searches, the line offset is the byte offset of the line in the file
+        for line_offset, line in iter_matching_line_offsets(file, marker_matcher):
+            fields = parse_uid_attributes(line)
+            uid_in = fields.get('in')
+            if uid_in:
+                records.append((line_offset, uid_in, uid_assy_positions(fields)))
+    return records
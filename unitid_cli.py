@@ -0,0 +1,204 @@
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime, date
+
+from search_engine import load_config, read_production_pcs, read_terms_file, run_line_search, run_uid_search, search_period, SearchProgress
+from genealogy import run_genealogy_search, genealogy_output_path, GENEALOGY_DIRECTIONS
+from log_setup import setup_logging
+
+# Function to parse a YYYY-MM-DD date argument, or a YYYY-MM-DD HH:MM[:SS] date and time for a period within a day
+def parse_date(value):
+    for date_format in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M'):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS]")
+
+# Function to parse a NAME=PATH drive argument
+def parse_drive_path(value):
+    drive_name, separator, drive_path = value.partition('=')
+    if not separator or not drive_name or not drive_path:
+        raise argparse.ArgumentTypeError(f"invalid drive '{value}', expected NAME=PATH")
+    return drive_name, drive_path
+
+# Function to parse a NAME=HOST:PORT search agent argument
+def parse_agent(value):
+    drive_name, separator, address = value.partition('=')
+    host, colon, port = address.rpartition(':')
+    if not separator or not drive_name or not colon or not host or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"invalid agent '{value}', expected NAME=HOST:PORT")
+    return drive_name, address
+
+# Function to run a search on a worker thread so that Ctrl+C can cancel it and keep the partial results.
+# Returns the summary of the search, or None when it failed.
+def run_in_worker(search_args, progress, cancel_event, report_path=None):
+    outcome = {}
+
+    def worker():
+        run_search = search_args[0]
+        outcome['summary'] = run_search(*search_args[1:], progress=progress, cancel_event=cancel_event, report_path=report_path)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    while thread.is_alive():
+        try:
+            thread.join(5)
+        except KeyboardInterrupt:
+            print("Cancelling search...", file=sys.stderr)
+            cancel_event.set()
+            continue
+        if progress is not None and thread.is_alive():
+            progress.take_results()
+            print(progress.describe(), file=sys.stderr)
+    return outcome.get('summary')
+
+# Function to print the outcome of a search and return the exit code
+def report(summary, incremental):
+    if summary is None:
+        print("Search failed", file=sys.stderr)
+        return 1
+    if summary['error']:
+        print(summary['error'], file=sys.stderr)
+        return 1
+
+    written = f"{summary['result_count']} {'new results added to' if incremental else 'results written to'} {summary['output_path']}"
+    if summary['cancelled']:
+        print(f"Search cancelled, {written}")
+    else:
+        print(written)
+    if summary['not_found']:
+        print(f"The following terms were not found: {', '.join(summary['not_found'])}")
+    if summary.get('report_path'):
+        print(f"Run report written to {summary['report_path']}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Search the production PC logs without the window.")
+    parser.add_argument('mode', choices=['lines', 'uids', 'genealogy'],
+                        help="output matching lines, UID (SN pair) rows or the subassembly trees of the searched uids")
+    parser.add_argument('--terms', help="comma separated search terms, as typed in the window")
+    parser.add_argument('--terms-file', help="CSV file with a search_terms column")
+    parser.add_argument('--start', type=parse_date, default=date.today(), help="start date YYYY-MM-DD, or date and time YYYY-MM-DD HH:MM[:SS] (default: today)")
+    parser.add_argument('--end', type=parse_date, default=date.today(), help="end date YYYY-MM-DD, or date and time YYYY-MM-DD HH:MM[:SS] (default: today)")
+    parser.add_argument('--station', default='', help="station name filter (default: all stations)")
+    parser.add_argument('--drive', action='append', default=[], help="production PC name from the production PC list, can be repeated")
+    parser.add_argument('--all-drives', action='store_true', help="search every production PC in the production PC list")
+    parser.add_argument('--drive-path', action='append', default=[], type=parse_drive_path,
+                        help="extra drive as NAME=PATH, can be repeated")
+    parser.add_argument('--agent', action='append', default=[], type=parse_agent, metavar='NAME=HOST:PORT',
+                        help="search the drive NAME through the search agent at HOST:PORT, can be repeated")
+    parser.add_argument('--ghp-common', action='store_true', help="search the GHP Common (non-standard) logs")
+    parser.add_argument('--subassys', type=int, default=1, help="number of subassemblies in uids mode (default: 1)")
+    parser.add_argument('--use-index', action='store_true', help="answer uids searches from the UID index")
+    parser.add_argument('--direction', choices=GENEALOGY_DIRECTIONS, default='backward',
+                        help="in genealogy mode trace backward from units to their subassemblies or forward to the units they went into (default: backward)")
+    parser.add_argument('--depth', type=int, metavar='N', help="in genealogy mode trace at most N levels (default: every level)")
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv', help="format of the default genealogy output, an --output path ending in .json is written as JSON (default: csv)")
+    parser.add_argument('--keep', choices=['first', 'latest'],
+                        help="row to keep of a uid group found more than once, the first one or the one from the newest file "
+                             "(default: uid_dedupe_keep of the config file)")
+    parser.add_argument('--full-rescan', action='store_true', help="list every directory again instead of using the cached listings")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only read the log data added since the last run of the same search and append the new results to the output")
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="repeat the search incrementally every SECONDS seconds until Ctrl+C")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="parse the log files in N processes, 0 parses them on the drive threads (default: parse_processes of the config file)")
+    parser.add_argument('--report', metavar='PATH',
+                        help="write the run report (time, bytes, files and matches per drive and station) to PATH (default: a file in run_report_dir of the config file)")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile the search with cProfile, the profile is written next to the run report as a .prof file")
+    parser.add_argument('--output', help="output file (default: the output path of the config file)")
+    parser.add_argument('--config', default='config.json', help="configuration file (default: config.json)")
+    parser.add_argument('--progress', action='store_true', help="print the search progress to stderr")
+    parser.add_argument('--log-level', help="log level, e.g. DEBUG for per-file output (default: log_level of the config file)")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+    if args.keep:
+        config['uid_dedupe_keep'] = args.keep
+    if args.processes is not None:
+        config['parse_processes'] = args.processes
+    if args.agent:
+        config['agent_hosts'] = dict(config['agent_hosts'], **dict(args.agent))
+    if args.profile:
+        config['profile_searches'] = True
+    setup_logging(config['log_path'], args.log_level or config['log_level'], config['log_max_bytes'], config['log_backup_count'])
+
+    search_terms = []
+    if args.terms:
+        search_terms.extend(args.terms.split(','))
+    if args.terms_file:
+        try:
+            search_terms.extend(read_terms_file(args.terms_file))
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read the terms file: {e}")
+    if not search_terms:
+        parser.error("no search terms, use --terms or --terms-file")
+    start_datetime, end_datetime = search_period(args.start, args.end)
+    if start_datetime > end_datetime:
+        parser.error("end date must be greater than or equal to start date")
+    if args.mode == 'uids' and args.subassys <= 0:
+        parser.error("there must be at least one subassembly")
+
+    # Resolve the drives, the production PC list is only read when drives are selected from it
+    drives = []
+    if args.drive or args.all_drives:
+        production_pcs = read_production_pcs(config['production_pc_path'], config['production_pc_cache_path'])
+        drive_names = sorted(production_pcs) if args.all_drives else args.drive
+        for drive_name in drive_names:
+            if drive_name not in production_pcs:
+                parser.error(f"unknown drive '{drive_name}'")
+            drives.append((drive_name, production_pcs[drive_name]))
+    drives.extend(args.drive_path)
+    if not drives:
+        parser.error("no drives, use --drive, --all-drives or --drive-path")
+
+    if args.watch is not None and args.watch <= 0:
+        parser.error("the watch interval must be greater than 0")
+    incremental = args.incremental or args.watch is not None
+    if incremental and args.use_index:
+        parser.error("--incremental and --watch cannot be combined with --use-index")
+    if incremental and args.mode == 'genealogy':
+        parser.error("--incremental and --watch cannot be used in genealogy mode")
+    if args.depth is not None and args.depth <= 0:
+        parser.error("--depth must be at least 1")
+    if args.profile and not args.report and not config['run_report_dir']:
+        parser.error("--profile needs --report or a run_report_dir in the config file")
+
+    if args.mode == 'lines':
+        output_path = args.output or config['output_path_lines']
+        search_args = (run_line_search, search_terms, args.start, args.end, args.station, drives, args.ghp_common,
+                       output_path, config, args.full_rescan, incremental)
+    elif args.mode == 'genealogy':
+        output_path = args.output or genealogy_output_path(config, args.format)
+        search_args = (run_genealogy_search, search_terms, args.start, args.end, drives, args.ghp_common, output_path, config,
+                       args.direction, args.depth, args.use_index, args.full_rescan)
+    else:
+        output_path = args.output or config['output_path_uids']
+        search_args = (run_uid_search, search_terms, args.start, args.end, args.station, drives, args.ghp_common,
+                       args.subassys, output_path, config, args.use_index, args.full_rescan, incremental)
+
+    # In watch mode the search runs again after every interval and only reads the new log data
+    while True:
+        progress = SearchProgress(config['max_live_result_lines']) if args.progress else None
+        cancel_event = threading.Event()
+        exit_code = report(run_in_worker(search_args, progress, cancel_event, args.report), incremental)
+        if args.watch is None or exit_code or cancel_event.is_set():
+            return exit_code
+        try:
+            time.sleep(args.watch)
+        except KeyboardInterrupt:
+            return 0
+
+if __name__ == '__main__':
+    sys.exit(main())